@@ -1,196 +1,638 @@
 #
 # The Chess AI class
-# Will utilize minimax and alpha beta pruning
+# Will utilize negamax and alpha beta pruning
 #
 # Author: Boo Sung Kim
 # Note: Code inspired from the pseudocode by Sebastian Lague
 # from enums import Player
-# TODO: switch undo moves to stack data structure
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
 import chess_engine
 from enums import Player
+from move_encoding import NO_MOVE, CAPTURE, EN_PASSANT, PROMOTION, PROMOTION_PIECES
+from piece_square_tables import PIECE_VALUES
+from tablebase import tablebase, WIN, LOSS
+from transposition_table import transposition_table, DEFAULT_SIZE_MB, EXACT, LOWER_BOUND, UPPER_BOUND
+
+# Scores are from the side to move's point of view. A mate found at ply n scores MATE_SCORE - n, so nearer mates
+# score higher; anything beyond MATE_BOUND is a mate score.
+MATE_SCORE = 5000000
+MATE_BOUND = MATE_SCORE - 1000
+DRAW_SCORE = 0
+INFINITE_SCORE = 10000000
+
+# Move ordering: the transposition table move, then captures and promotions by most valuable victim / least valuable
+# attacker, then the two killer moves of the ply, then the other quiet moves by their history score
+_ORDER_VALUES = {"p": 1, "n": 2, "b": 3, "r": 4, "q": 5, "k": 6}
+TT_MOVE_ORDER = 1 << 30
+CAPTURE_ORDER = 1 << 29
+KILLER_ORDER = 1 << 28
+HISTORY_LIMIT = KILLER_ORDER - 1
+
+# a capture is skipped in the quiescence search when even this much more than the victim's value cannot reach alpha
+DELTA_MARGIN = 20
+
+# half width of the first aspiration window around the previous iteration's score, doubled after every failure
+ASPIRATION_WINDOW = 15
+
+# Null move pruning: if passing the turn and searching NULL_MOVE_REDUCTION plies less still fails high, the node does
+NULL_MOVE_REDUCTION = 2
+# Late move reductions: quiet moves after the first LATE_MOVE_COUNT are searched one ply less, from LATE_MOVE_DEPTH
+LATE_MOVE_COUNT = 3
+LATE_MOVE_DEPTH = 3
+
+MAX_SEARCH_DEPTH = 64
+MAX_PLY = 128
+# the clock is read once every this many nodes (a power of two minus one, used as a mask)
+TIME_CHECK_INTERVAL = 1023
+
+
+class search_result:
+    '''
+    what a search found: the best move of the root, its score, the principal variation and the nodes visited,
+    with how often a null window (PVS) or an aspiration window had to be searched again
+    '''
+    def __init__(self, best_move, score, principal_variation, nodes, depth, pvs_re_searches=0,
+                 aspiration_re_searches=0):
+        self.best_move = best_move
+        self.score = score
+        self.principal_variation = principal_variation
+        self.nodes = nodes
+        self.depth = depth
+        self.pvs_re_searches = pvs_re_searches
+        self.aspiration_re_searches = aspiration_re_searches
+
+    def __repr__(self):
+        return "search_result(best_move={}, score={}, depth={}, nodes={}, pv={}, re-searches={}/{})".format(
+            self.best_move, self.score, self.depth, self.nodes, self.principal_variation, self.pvs_re_searches,
+            self.aspiration_re_searches)
 
 
 class chess_ai:
     '''
-    call minimax with alpha beta pruning
+    search with negamax and alpha beta pruning
     evaluate board
-    get the value of each piece
     '''
-    def minimax_white(self, game_state, depth, alpha, beta, maximizing_player, player_color):
-        csc = game_state.checkmate_stalemate_checker()
-        if maximizing_player:
-            if csc == 0:
-                return 5000000
-            elif csc == 1:
-                return -5000000
-            elif csc == 2:
-                return 100
-        elif not maximizing_player:
-            if csc == 1:
-                return 5000000
-            elif csc == 0:
-                return -5000000
-            elif csc == 2:
-                return 100
-
-        if depth <= 0 or csc != 3:
-            return self.evaluate_board(game_state, Player.PLAYER_1)
-
-        if maximizing_player:
-            max_evaluation = -10000000
-            all_possible_moves = game_state.get_all_legal_moves("black")
-            for move_pair in all_possible_moves:
-                game_state.move_piece(move_pair[0], move_pair[1], True)
-                evaluation = self.minimax_white(game_state, depth - 1, alpha, beta, False, "white")
-                game_state.undo_move()
-
-                if max_evaluation < evaluation:
-                    max_evaluation = evaluation
-                    best_possible_move = move_pair
-                alpha = max(alpha, evaluation)
-                if beta <= alpha:
-                    break
-            if depth == 3:
-                return best_possible_move
-            else:
-                return max_evaluation
+    def __init__(self, transposition_table_mb=DEFAULT_SIZE_MB, null_move_pruning=True, late_move_reductions=True,
+                 table=None, opening_book=None, tablebase=None):
+        # table: an existing transposition_table to search with, such as one in shared memory
+        self.transposition_table = table if table is not None else transposition_table(transposition_table_mb)
+        # an opening_book.opening_book consulted by choose_move before searching, or None
+        self.opening_book = opening_book
+        # a tablebase.tablebase whose moves choose_move plays at the root and whose scores cut the search short, or None
+        self.tablebase = tablebase
+        self.null_move_pruning = null_move_pruning
+        self.late_move_reductions = late_move_reductions
+        self.nodes = 0
+        self.pvs_re_searches = 0
+        self.aspiration_re_searches = 0
+        self._principal_variations = [[] for _ in range(0, MAX_PLY + 1)]
+        # two quiet moves per ply that caused a beta cutoff, and a score per piece and ending square
+        self._killers = [[NO_MOVE, NO_MOVE] for _ in range(0, MAX_PLY + 1)]
+        self._history = {}
+        # search budget, checked by _negamax
+        self._deadline = None
+        self._node_limit = None
+        self._can_stop = False
+        self._stopped = False
+        # worker processes of parallel_search, started on first use
+        self._executor = None
+        self._executor_workers = 0
+        # Lazy SMP helpers: their pool, the shared table's size before sharing, and a shared byte telling them to stop
+        self._smp_executor = None
+        self._smp_workers = 0
+        self._local_table_mb = 0
+        self._stop_block = None
+        # set in a helper process to that shared byte, checked with the clock
+        self._stop_flag = None
+
+    def choose_move(self, game_state, time_limit=None, node_limit=None, max_depth=MAX_SEARCH_DEPTH):
+        '''
+        the move to play in a game, as a search_result: a move from the opening book or the tablebases is returned at
+        depth 0 without searching, any other position is searched with iterative_deepening
+        only this entry point consults the book and plays tablebase moves at the root; the search methods always search
+        '''
+        if self.opening_book is not None:
+            book_move = self.opening_book.choose_move(game_state)
+            if book_move is not None:
+                return search_result(book_move, 0, [book_move], 0, 0)
+        if self.tablebase is not None:
+            tablebase_move = self.tablebase.choose_move(game_state)
+            if tablebase_move is not None:
+                return search_result(tablebase_move, self._probe_tablebase(game_state, 0), [tablebase_move], 0, 0)
+        return self.iterative_deepening(game_state, max_depth, time_limit, node_limit)
+
+    def search(self, game_state, depth):
+        '''
+        search the side to move to the given depth and return a search_result
+        the best move is NO_MOVE when the side to move has no legal move
+        '''
+        return self.iterative_deepening(game_state, max_depth=depth, first_depth=depth)
+
+    def iterative_deepening(self, game_state, max_depth=MAX_SEARCH_DEPTH, time_limit=None, node_limit=None,
+                            first_depth=1):
+        '''
+        search depth 1, 2, ... until max_depth, time_limit (seconds) or node_limit (total nodes) is reached
+        return the search_result of the last iteration that finished; the first iteration always finishes
+        '''
+        start_time = time.perf_counter()
+        self._start_search(start_time + time_limit if time_limit is not None else None, node_limit)
+
+        result = None
+        max_depth = max(1, min(max_depth, MAX_SEARCH_DEPTH))
+        for depth in range(min(first_depth, max_depth), max_depth + 1):
+            score = self._aspiration_search(game_state, depth, result.score if result else None)
+            if self._stopped:
+                break
+            principal_variation = list(self._principal_variations[0])
+            best_move = principal_variation[0] if principal_variation else NO_MOVE
+            result = search_result(best_move, score, principal_variation, self.nodes, depth, self.pvs_re_searches,
+                                   self.aspiration_re_searches)
+            # stop on a mate or when the next iteration, several times longer, could not finish in time
+            if best_move == NO_MOVE or abs(score) > MATE_BOUND:
+                break
+            if time_limit is not None and time.perf_counter() - start_time > time_limit / 2:
+                break
+            self._can_stop = True
+        result.nodes = self.nodes
+        return result
+
+    def _start_search(self, deadline=None, node_limit=None):
+        # reset the counters, budget and move ordering tables before a search
+        self.transposition_table.new_search()
+        self.nodes = 0
+        self.pvs_re_searches = 0
+        self.aspiration_re_searches = 0
+        self._deadline = deadline
+        self._node_limit = node_limit
+        self._can_stop = False
+        self._stopped = False
+        for killers in self._killers:
+            killers[0] = killers[1] = NO_MOVE
+        # older history still helps, but should not outweigh what this search learns
+        for scores in self._history.values():
+            for square in range(0, 64):
+                scores[square] >>= 1
+
+    def parallel_search(self, game_state, depth, workers=None):
+        '''
+        search the side to move to the given depth with the root moves split over a pool of worker processes
+        the first root move (the best of a serial search one ply shallower) is searched here with the full window to
+        set alpha; every other move is sent to a worker as a FEN and a 16-bit move together with the best score so
+        far, tried with a null window, and searched again with (alpha, infinity) only when it beats alpha
+        '''
+        player = Player.PLAYER_1 if game_state.whose_turn() else Player.PLAYER_2
+        root_moves = game_state.get_legal_moves_encoded(player)
+        if depth <= 1 or len(root_moves) <= 1:
+            return self.search(game_state, depth)
+
+        ordering = self.search(game_state, depth - 1)
+        nodes = ordering.nodes
+        self._start_search()
+        root_moves = self._order_moves(game_state, root_moves, ordering.best_move, 0)
+
+        best_move = root_moves[0]
+        best_score, principal_variation, first_nodes, re_searches = self._search_root_move(
+            game_state, best_move, depth, -INFINITE_SCORE)
+        nodes += first_nodes
+        pvs_re_searches = re_searches
+
+        fen = game_state.to_fen()
+        executor = self._get_executor(workers)
+        pending = {}
+        remaining_moves = list(root_moves[1:])
+        # keep one move per worker in flight, so moves sent later get the alpha raised by the ones already back
+        while remaining_moves or pending:
+            while remaining_moves and len(pending) < self._executor_workers:
+                move = remaining_moves.pop(0)
+                pending[executor.submit(_search_root_move_in_worker, fen, move, depth, best_score)] = move
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                move = pending.pop(future)
+                score, move_principal_variation, move_nodes, re_searches = future.result()
+                nodes += move_nodes
+                pvs_re_searches += re_searches
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+                    principal_variation = move_principal_variation
+        return search_result(best_move, best_score, principal_variation, nodes, depth, pvs_re_searches)
+
+    def _search_root_move(self, game_state, move, depth, alpha):
+        '''
+        score one root move: a null window search against alpha, and the exact score when it beats alpha
+        return (score, principal variation, nodes, re-searches)
+        '''
+        nodes = self.nodes
+        pvs_re_searches = self.pvs_re_searches
+        game_state.make(move)
+        if alpha == -INFINITE_SCORE:
+            score = -self._negamax(game_state, depth - 1, -INFINITE_SCORE, INFINITE_SCORE, 1)
         else:
-            min_evaluation = 10000000
-            all_possible_moves = game_state.get_all_legal_moves("white")
-            for move_pair in all_possible_moves:
-                game_state.move_piece(move_pair[0], move_pair[1], True)
-                evaluation = self.minimax_white(game_state, depth - 1, alpha, beta, True, "black")
-                game_state.undo_move()
-
-                if min_evaluation > evaluation:
-                    min_evaluation = evaluation
-                    best_possible_move = move_pair
-                beta = min(beta, evaluation)
-                if beta <= alpha:
-                    break
-            if depth == 3:
-                return best_possible_move
-            else:
-                return min_evaluation
-
-    def minimax_black(self, game_state, depth, alpha, beta, maximizing_player, player_color):
-        csc = game_state.checkmate_stalemate_checker()
-        if maximizing_player:
-            if csc == 1:
-                return 5000000
-            elif csc == 0:
-                return -5000000
-            elif csc == 2:
-                return 100
-        elif not maximizing_player:
-            if csc == 0:
-                return 5000000
-            elif csc == 1:
-                return -5000000
-            elif csc == 2:
-                return 100
-
-        if depth <= 0 or csc != 3:
-            return self.evaluate_board(game_state, Player.PLAYER_2)
-
-        if maximizing_player:
-            max_evaluation = -10000000
-            all_possible_moves = game_state.get_all_legal_moves("white")
-            for move_pair in all_possible_moves:
-                game_state.move_piece(move_pair[0], move_pair[1], True)
-                evaluation = self.minimax_black(game_state, depth - 1, alpha, beta, False, "black")
-                game_state.undo_move()
-
-                if max_evaluation < evaluation:
-                    max_evaluation = evaluation
-                    best_possible_move = move_pair
-                alpha = max(alpha, evaluation)
-                if beta <= alpha:
-                    break
-            if depth == 3:
-                return best_possible_move
+            score = -self._negamax(game_state, depth - 1, -alpha - 1, -alpha, 1)
+            if score > alpha:
+                self.pvs_re_searches += 1
+                score = -self._negamax(game_state, depth - 1, -INFINITE_SCORE, -alpha, 1)
+        game_state.unmake()
+        return score, [move] + self._principal_variations[1], self.nodes - nodes, \
+            self.pvs_re_searches - pvs_re_searches
+
+    def _get_executor(self, workers):
+        # the pool is kept between searches, so the workers keep their transposition tables
+        workers = workers or os.cpu_count() or 1
+        if self._executor is None or self._executor_workers != workers:
+            self.shutdown_workers()
+            self._executor_workers = workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(self.transposition_table.get_size_bytes() >> 20, self.null_move_pruning,
+                          self.late_move_reductions, self._get_tablebase_directory()))
+        return self._executor
+
+    def lazy_smp_search(self, game_state, max_depth=MAX_SEARCH_DEPTH, time_limit=None, node_limit=None, workers=None):
+        '''
+        iterative deepening here and in helper processes at the same time, all sharing one transposition table in
+        shared memory; half of the helpers start one ply deeper so they fill the table ahead of the others
+        nothing else is coordinated: the helpers only speed up this search through the entries they store
+        return the search_result of this process, or of a helper that finished a deeper iteration
+        '''
+        executor = self._get_smp_executor(workers)
+        self._stop_block.buf[0] = 0
+        fen = game_state.to_fen()
+        # the helpers start from this process's generation, so every process moves on to the same one next
+        generation = self.transposition_table.get_generation()
+        futures = [executor.submit(_lazy_smp_search_in_worker, fen, game_state.get_zobrist_key(), generation,
+                                   max_depth, time_limit, node_limit, 1 + helper % 2)
+                   for helper in range(1, self._smp_workers + 1)]
+        result = self.iterative_deepening(game_state, max_depth, time_limit, node_limit)
+        self._stop_block.buf[0] = 1
+        nodes = result.nodes
+        for future in futures:
+            helper_result = future.result()
+            nodes += helper_result.nodes
+            if helper_result.depth > result.depth and helper_result.best_move != NO_MOVE:
+                result = helper_result
+        result.nodes = nodes
+        return result
+
+    def _get_smp_executor(self, workers):
+        # the shared table replaces this searcher's own table until shutdown_workers
+        workers = workers or os.cpu_count() or 1
+        if self._smp_executor is None or self._smp_workers != workers:
+            self._shutdown_smp_workers()
+            self._local_table_mb = self.transposition_table.get_size_bytes() >> 20
+            self.transposition_table = transposition_table.create_shared(self._local_table_mb)
+            self._stop_block = shared_memory.SharedMemory(create=True, size=1)
+            self._smp_workers = workers
+            self._smp_executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_lazy_smp_worker,
+                initargs=(self.transposition_table.shared_memory.name, self._stop_block.name, self.null_move_pruning,
+                          self.late_move_reductions, self._get_tablebase_directory()))
+        return self._smp_executor
+
+    # Where the worker processes open the same tablebases, so their scores agree with this process's
+    def _get_tablebase_directory(self):
+        return self.tablebase.directory if self.tablebase is not None else None
+
+    def _shutdown_smp_workers(self):
+        if self._smp_executor is not None:
+            self._smp_executor.shutdown()
+            self._smp_executor = None
+            self.transposition_table.close(unlink=True)
+            self.transposition_table = transposition_table(self._local_table_mb)
+            self._stop_block.close()
+            self._stop_block.unlink()
+            self._stop_block = None
+
+    def shutdown_workers(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._shutdown_smp_workers()
+
+    def _aspiration_search(self, game_state, depth, previous_score):
+        '''
+        search the root in a narrow window around the previous iteration's score, widening the side that failed
+        until the score falls inside, so most iterations cut off far more than a full window would
+        '''
+        if previous_score is None or abs(previous_score) > MATE_BOUND:
+            return self._negamax(game_state, depth, -INFINITE_SCORE, INFINITE_SCORE, 0)
+        window = ASPIRATION_WINDOW
+        alpha = previous_score - window
+        beta = previous_score + window
+        while True:
+            score = self._negamax(game_state, depth, alpha, beta, 0)
+            if self._stopped:
+                return score
+            if score <= alpha:
+                alpha = max(score - window, -INFINITE_SCORE)
+            elif score >= beta:
+                beta = min(score + window, INFINITE_SCORE)
             else:
-                return max_evaluation
+                return score
+            self.aspiration_re_searches += 1
+            window *= 2
+
+    def _out_of_budget(self):
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            return True
+        if self.nodes & TIME_CHECK_INTERVAL:
+            return False
+        if self._stop_flag is not None and self._stop_flag[0]:
+            return True
+        return self._deadline is not None and time.perf_counter() >= self._deadline
+
+    def _negamax(self, game_state, depth, alpha, beta, ply, allow_null_move=True):
+        if depth <= 0:
+            return self._quiescence(game_state, alpha, beta, ply)
+        self.nodes += 1
+        if self._can_stop and self._out_of_budget():
+            self._stopped = True
+        if self._stopped:
+            return 0
+        self._principal_variations[ply] = []
+        if self.tablebase is not None and ply > 0:
+            tablebase_score = self._probe_tablebase(game_state, ply)
+            if tablebase_score is not None:
+                return tablebase_score
+        player = Player.PLAYER_1 if game_state.whose_turn() else Player.PLAYER_2
+
+        key = game_state.get_zobrist_key()
+        original_alpha = alpha
+        if ply == 0:
+            # the root has to return a move, so it only takes the stored move and always searches
+            entry = self.transposition_table.probe(key)
+            tt_move = entry[0] if entry else NO_MOVE
         else:
-            min_evaluation = 10000000
-            all_possible_moves = game_state.get_all_legal_moves("black")
-            for move_pair in all_possible_moves:
-                game_state.move_piece(move_pair[0], move_pair[1], True)
-                evaluation = self.minimax_black(game_state, depth - 1, alpha, beta, True, "white")
-                game_state.undo_move()
-
-                if min_evaluation > evaluation:
-                    min_evaluation = evaluation
-                    best_possible_move = move_pair
-                beta = min(beta, evaluation)
-                if beta <= alpha:
-                    break
-            if depth == 3:
-                return best_possible_move
-            else:
-                return min_evaluation
+            tt_score, alpha, beta, tt_move = self._probe_transposition_table(key, depth, alpha, beta, ply)
+            if tt_score is not None:
+                return tt_score
 
-    def evaluate_board(self, game_state, player):
-        evaluation_score = 0
-        for row in range(0, 8):
-            for col in range(0, 8):
-                if game_state.is_valid_piece(row, col):
-                    evaluated_piece = game_state.get_piece(row, col)
-                    evaluation_score += self.get_piece_value(evaluated_piece, player)
-        return evaluation_score
-
-    def get_piece_value(self, piece, player):
-        if player is Player.PLAYER_1:
-            if piece.is_player("black"):
-                if piece.get_name() is "k":
-                    return -1000
-                elif piece.get_name() is "q":
-                    return -100
-                elif piece.get_name() is "r":
-                    return -50
-                elif piece.get_name() is "b":
-                    return -30
-                elif piece.get_name() is "n":
-                    return -30
-                elif piece.get_name() is "p":
-                    return -10
+        in_check = game_state.in_check()
+        # null move pruning, only in null window nodes, never twice in a row, and not with only pawns left since
+        # in those endgames passing can be the one thing the side to move cannot do (zugzwang)
+        if self.null_move_pruning and allow_null_move and ply > 0 and not in_check and beta - alpha == 1 and \
+                depth > NULL_MOVE_REDUCTION and abs(beta) < MATE_BOUND and self._has_pieces(game_state, player):
+            game_state.make_null_move()
+            score = -self._negamax(game_state, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1, False)
+            game_state.unmake_null_move()
+            if self._stopped:
+                return 0
+            if score >= beta:
+                return beta
+
+        all_possible_moves = game_state.get_legal_moves_encoded(player)
+        if not all_possible_moves:
+            if in_check:
+                return -MATE_SCORE + ply
+            return DRAW_SCORE
+
+        best_score = -INFINITE_SCORE
+        best_possible_move = NO_MOVE
+        for move_number, move in enumerate(self._order_moves(game_state, all_possible_moves, tt_move, ply)):
+            game_state.make(move)
+            if move_number == 0:
+                score = -self._negamax(game_state, depth - 1, -beta, -alpha, ply + 1)
             else:
-                if piece.get_name() is "k":
-                    return 1000
-                elif piece.get_name() is "q":
-                    return 100
-                elif piece.get_name() is "r":
-                    return 50
-                elif piece.get_name() is "b":
-                    return 30
-                elif piece.get_name() is "n":
-                    return 30
-                elif piece.get_name() is "p":
-                    return 10
+                # principal variation search: prove the move is no better than alpha with a null window, and only
+                # search it again with the full window when it is
+                # late quiet moves, rarely the best after ordering, are first tried one ply shallower
+                if self.late_move_reductions and move_number >= LATE_MOVE_COUNT and depth >= LATE_MOVE_DEPTH and \
+                        not in_check and not (move >> 12) & (CAPTURE | PROMOTION) and not game_state.in_check() and \
+                        move not in self._killers[ply]:
+                    score = -self._negamax(game_state, depth - 2, -alpha - 1, -alpha, ply + 1)
+                else:
+                    score = alpha + 1
+                if score > alpha and not self._stopped:
+                    score = -self._negamax(game_state, depth - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < score < beta and not self._stopped:
+                    self.pvs_re_searches += 1
+                    score = -self._negamax(game_state, depth - 1, -beta, -alpha, ply + 1)
+            game_state.unmake()
+            if self._stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                best_possible_move = move
+                if score > alpha:
+                    alpha = score
+                    self._principal_variations[ply] = [move] + self._principal_variations[ply + 1]
+                    if alpha >= beta:
+                        if not (move >> 12) & (CAPTURE | PROMOTION):
+                            self._update_quiet_cutoff(game_state, move, depth, ply)
+                        break
+
+        self._store_transposition_table(key, depth, best_score, original_alpha, beta, best_possible_move, ply)
+        return best_score
+
+    @staticmethod
+    def _has_pieces(game_state, player):
+        # anything besides pawns and the king
+        return bool(game_state.get_pieces_bitboard(player, "n") | game_state.get_pieces_bitboard(player, "b") |
+                    game_state.get_pieces_bitboard(player, "r") | game_state.get_pieces_bitboard(player, "q"))
+
+    def _quiescence(self, game_state, alpha, beta, ply):
+        '''
+        search only captures and promotions until the position is quiet, so the evaluation is not taken in the
+        middle of an exchange
+        - stand pat: the side to move can decline every capture, so the static evaluation is a lower bound
+        - delta pruning: skip captures that cannot bring the score back up to alpha even with a margin
+        when in check every evasion is searched, since standing pat is not an option
+        '''
+        self.nodes += 1
+        if self._can_stop and self._out_of_budget():
+            self._stopped = True
+        if self._stopped:
+            return 0
+        self._principal_variations[ply] = []
+        player = Player.PLAYER_1 if game_state.whose_turn() else Player.PLAYER_2
+
+        in_check = game_state.in_check()
+        if in_check:
+            stand_pat = -INFINITE_SCORE
+            all_possible_moves = game_state.get_legal_moves_encoded(player)
+            if not all_possible_moves:
+                return -MATE_SCORE + ply
+        else:
+            stand_pat = self.evaluate_board(game_state, player)
+            if stand_pat >= beta or ply >= MAX_PLY:
+                return stand_pat
+            # not even winning a queen would raise alpha
+            if stand_pat + PIECE_VALUES["q"] + DELTA_MARGIN <= alpha:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            all_possible_moves = game_state.get_legal_moves_encoded(player, captures_only=True)
+
+        best_score = stand_pat
+        board = game_state.board
+        for move in self._order_moves(game_state, all_possible_moves, NO_MOVE, ply):
+            flags = move >> 12
+            if not in_check and flags & CAPTURE and not flags & PROMOTION:
+                ending_square = (move >> 6) & 63
+                victim = "p" if flags == EN_PASSANT else board[ending_square >> 3][ending_square & 7].get_name()
+                if stand_pat + PIECE_VALUES[victim] + DELTA_MARGIN <= alpha:
+                    continue
+            game_state.make(move)
+            score = -self._quiescence(game_state, -beta, -alpha, ply + 1)
+            game_state.unmake()
+            if self._stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _probe_tablebase(self, game_state, ply):
+        '''
+        the exact score of a position the tablebases cover, as a mate score counted from the root, or None
+        '''
+        entry = self.tablebase.probe(game_state)
+        if entry is None:
+            return None
+        result, moves = entry
+        if result == WIN:
+            return MATE_SCORE - ply - (2 * moves - 1)
+        if result == LOSS:
+            return -MATE_SCORE + ply + 2 * moves
+        return DRAW_SCORE
+
+    def _probe_transposition_table(self, key, depth, alpha, beta, ply):
+        '''
+        return (score or None, alpha, beta, best move) from the stored entry of the position
+        the score is only given when the entry is deep enough to end the search of the node
+        '''
+        entry = self.transposition_table.probe(key)
+        if entry is None:
+            return None, alpha, beta, NO_MOVE
+        move, score, entry_depth, bound = entry
+        if entry_depth >= depth:
+            # mate scores are stored relative to the node, the search wants them relative to the root
+            if score > MATE_BOUND:
+                score -= ply
+            elif score < -MATE_BOUND:
+                score += ply
+            if bound == EXACT:
+                return score, alpha, beta, move
+            elif bound == LOWER_BOUND:
+                alpha = max(alpha, score)
+            elif bound == UPPER_BOUND:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return score, alpha, beta, move
+        return None, alpha, beta, move
+
+    def _store_transposition_table(self, key, depth, score, alpha, beta, move, ply):
+        # alpha and beta are the window the node was searched with
+        if score <= alpha:
+            bound = UPPER_BOUND
+        elif score >= beta:
+            bound = LOWER_BOUND
         else:
-            if piece.is_player("white"):
-                if piece.get_name() is "k":
-                    return 1000
-                elif piece.get_name() is "q":
-                    return 100
-                elif piece.get_name() is "r":
-                    return 50
-                elif piece.get_name() is "b":
-                    return 30
-                elif piece.get_name() is "n":
-                    return 30
-                elif piece.get_name() is "p":
-                    return 10
+            bound = EXACT
+        if score > MATE_BOUND:
+            score += ply
+        elif score < -MATE_BOUND:
+            score -= ply
+        self.transposition_table.store(key, depth, score, bound, move)
+
+    def _order_moves(self, game_state, moves, tt_move, ply):
+        '''
+        return the moves sorted so the ones most likely to cause a cutoff are searched first
+        '''
+        board = game_state.board
+        killers = self._killers[ply]
+        history = self._history
+        scored_moves = []
+        for move in moves:
+            if move == tt_move:
+                order = TT_MOVE_ORDER
+            elif (move >> 12) & (CAPTURE | PROMOTION):
+                starting_square = move & 63
+                ending_square = (move >> 6) & 63
+                flags = move >> 12
+                attacker = board[starting_square >> 3][starting_square & 7]
+                if flags == EN_PASSANT:
+                    victim_value = _ORDER_VALUES["p"]
+                elif flags & CAPTURE:
+                    victim_value = _ORDER_VALUES[board[ending_square >> 3][ending_square & 7].get_name()]
+                else:
+                    victim_value = 0
+                if flags & PROMOTION:
+                    victim_value += _ORDER_VALUES[PROMOTION_PIECES[flags & 3]]
+                order = CAPTURE_ORDER + victim_value * 8 - _ORDER_VALUES[attacker.get_name()]
+            elif move == killers[0]:
+                order = KILLER_ORDER + 1
+            elif move == killers[1]:
+                order = KILLER_ORDER
             else:
-                if piece.get_name() is "k":
-                    return -1000
-                elif piece.get_name() is "q":
-                    return -100
-                elif piece.get_name() is "r":
-                    return -50
-                elif piece.get_name() is "b":
-                    return -30
-                elif piece.get_name() is "n":
-                    return -30
-                elif piece.get_name() is "p":
-                    return -10
\ No newline at end of file
+                starting_square = move & 63
+                scores = history.get(board[starting_square >> 3][starting_square & 7])
+                order = scores[(move >> 6) & 63] if scores else 0
+            scored_moves.append((order, move))
+        scored_moves.sort(reverse=True)
+        return [move for order, move in scored_moves]
+
+    def _update_quiet_cutoff(self, game_state, move, depth, ply):
+        # remember a quiet move that refuted the node as a killer of the ply and in the history of its piece
+        killers = self._killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        starting_square = move & 63
+        piece = game_state.board[starting_square >> 3][starting_square & 7]
+        scores = self._history.get(piece)
+        if scores is None:
+            scores = self._history[piece] = [0] * 64
+        ending_square = (move >> 6) & 63
+        scores[ending_square] = min(scores[ending_square] + depth * depth, HISTORY_LIMIT)
+
+    # Material and piece-square balance from the player's point of view, kept up to date by the game state
+    def evaluate_board(self, game_state, player):
+        return game_state.get_evaluation(player)
+
+
+# The searcher of each parallel_search / lazy_smp_search worker process
+_worker_ai = None
+_worker_stop_block = None
+
+
+def _open_worker_tablebase(tablebase_directory):
+    return tablebase(tablebase_directory) if tablebase_directory is not None else None
+
+
+def _init_worker(transposition_table_mb, null_move_pruning, late_move_reductions, tablebase_directory):
+    global _worker_ai
+    _worker_ai = chess_ai(transposition_table_mb, null_move_pruning, late_move_reductions,
+                          tablebase=_open_worker_tablebase(tablebase_directory))
+
+
+def _search_root_move_in_worker(fen, move, depth, alpha):
+    _worker_ai._start_search()
+    return _worker_ai._search_root_move(chess_engine.game_state.from_fen(fen), move, depth, alpha)
+
+
+def _init_lazy_smp_worker(table_name, stop_name, null_move_pruning, late_move_reductions, tablebase_directory):
+    global _worker_ai, _worker_stop_block
+    _worker_ai = chess_ai(null_move_pruning=null_move_pruning, late_move_reductions=late_move_reductions,
+                          table=transposition_table.attach_shared(table_name),
+                          tablebase=_open_worker_tablebase(tablebase_directory))
+    # kept referenced so the stop flag's memory stays mapped
+    _worker_stop_block = shared_memory.SharedMemory(name=stop_name)
+    _worker_ai._stop_flag = _worker_stop_block.buf
+
+
+def _lazy_smp_search_in_worker(fen, root_key, generation, max_depth, time_limit, node_limit, first_depth):
+    # a root rebuilt with another key would never share a table entry with the main search
+    game_state = chess_engine.game_state.from_fen(fen)
+    if game_state.get_zobrist_key() != root_key:
+        raise ValueError("helper root key does not match the main search for " + fen)
+    _worker_ai.transposition_table.set_generation(generation)
+    return _worker_ai.iterative_deepening(game_state, max_depth, time_limit, node_limit, first_depth)
@@ -0,0 +1,143 @@
+#
+# Precomputed attack tables
+# Will store, for every square, the squares attacked by knights, kings and pawns and the ray of squares in each of
+# the eight sliding directions. The tables are computed once when the module is imported.
+#
+# Rook and bishop attacks are looked up by hashed occupancy: each square keeps a dictionary from the occupied squares
+# on its rays (edges excluded) to the attack set they produce, so a slider's attacks are one dictionary lookup.
+#
+from bitboard import square_index, lsb, msb, iterate_bits
+from enums import Player
+
+# (row_change, col_change) of the eight sliding directions
+NORTH, SOUTH, WEST, EAST = 0, 1, 2, 3
+NORTH_WEST, NORTH_EAST, SOUTH_WEST, SOUTH_EAST = 4, 5, 6, 7
+DIRECTIONS = [(-1, 0), (+1, 0), (0, -1), (0, +1), (-1, -1), (-1, +1), (+1, -1), (+1, +1)]
+ROOK_DIRECTIONS = (NORTH, SOUTH, WEST, EAST)
+BISHOP_DIRECTIONS = (NORTH_WEST, NORTH_EAST, SOUTH_WEST, SOUTH_EAST)
+
+KNIGHT_CHANGES = [(-2, -1), (-2, +1), (-1, -2), (-1, +2), (+1, -2), (+1, +2), (+2, +1), (+2, -1)]
+KING_CHANGES = [(-1, -1), (+0, -1), (+1, -1), (-1, +0), (+1, +0), (-1, +1), (+0, +1), (+1, +1)]
+
+
+def _step_mask(row, col, changes):
+    mask = 0
+    for row_change, col_change in changes:
+        new_row = row + row_change
+        new_col = col + col_change
+        if 0 <= new_row < 8 and 0 <= new_col < 8:
+            mask |= 1 << square_index(new_row, new_col)
+    return mask
+
+
+def _ray_mask(row, col, direction):
+    mask = 0
+    row_change, col_change = DIRECTIONS[direction]
+    new_row = row + row_change
+    new_col = col + col_change
+    while 0 <= new_row < 8 and 0 <= new_col < 8:
+        mask |= 1 << square_index(new_row, new_col)
+        new_row += row_change
+        new_col += col_change
+    return mask
+
+
+KNIGHT_ATTACKS = [_step_mask(square >> 3, square & 7, KNIGHT_CHANGES) for square in range(64)]
+KING_ATTACKS = [_step_mask(square >> 3, square & 7, KING_CHANGES) for square in range(64)]
+# White pawns move towards row 7, black pawns towards row 0
+PAWN_ATTACKS = {
+    Player.PLAYER_1: [_step_mask(square >> 3, square & 7, [(+1, -1), (+1, +1)]) for square in range(64)],
+    Player.PLAYER_2: [_step_mask(square >> 3, square & 7, [(-1, -1), (-1, +1)]) for square in range(64)],
+}
+RAYS = [[_ray_mask(square >> 3, square & 7, direction) for square in range(64)] for direction in range(8)]
+
+# Rays pointing towards higher square indexes find their first blocker with lsb, the others with msb
+_POSITIVE_DIRECTION = [row_change * 8 + col_change > 0 for row_change, col_change in DIRECTIONS]
+
+
+def first_blocker(direction, square, occupancy):
+    '''
+    Return the square of the first occupied square along the ray, or -1 if the ray is empty
+    '''
+    blockers = RAYS[direction][square] & occupancy
+    if not blockers:
+        return -1
+    if _POSITIVE_DIRECTION[direction]:
+        return lsb(blockers)
+    return msb(blockers)
+
+
+def ray_attacks(direction, square, occupancy):
+    '''
+    Return the squares attacked along one ray, up to and including the first blocker
+    '''
+    ray = RAYS[direction][square]
+    blocker = first_blocker(direction, square, occupancy)
+    if blocker == -1:
+        return ray
+    return ray ^ RAYS[direction][blocker]
+
+
+def _relevant_occupancy_mask(square, directions):
+    # the edge square of each ray never changes the attacks, so it is left out of the lookup key
+    mask = 0
+    for direction in directions:
+        ray = RAYS[direction][square]
+        if _POSITIVE_DIRECTION[direction]:
+            edge = msb(ray) if ray else -1
+        else:
+            edge = lsb(ray) if ray else -1
+        if edge != -1:
+            mask |= ray & ~(1 << edge)
+    return mask
+
+
+def _sliding_attack_table(square, directions, mask):
+    # walk every subset of the relevant occupancy (carry-rippler) and store the attacks it produces
+    table = {}
+    subset = 0
+    while True:
+        attacks = 0
+        for direction in directions:
+            attacks |= ray_attacks(direction, square, subset)
+        table[subset] = attacks
+        subset = (subset - mask) & mask
+        if subset == 0:
+            break
+    return table
+
+
+ROOK_MASKS = [_relevant_occupancy_mask(square, ROOK_DIRECTIONS) for square in range(64)]
+BISHOP_MASKS = [_relevant_occupancy_mask(square, BISHOP_DIRECTIONS) for square in range(64)]
+ROOK_TABLE = [_sliding_attack_table(square, ROOK_DIRECTIONS, ROOK_MASKS[square]) for square in range(64)]
+BISHOP_TABLE = [_sliding_attack_table(square, BISHOP_DIRECTIONS, BISHOP_MASKS[square]) for square in range(64)]
+
+
+def rook_attacks(square, occupancy):
+    return ROOK_TABLE[square][occupancy & ROOK_MASKS[square]]
+
+
+def bishop_attacks(square, occupancy):
+    return BISHOP_TABLE[square][occupancy & BISHOP_MASKS[square]]
+
+
+def queen_attacks(square, occupancy):
+    return ROOK_TABLE[square][occupancy & ROOK_MASKS[square]] | BISHOP_TABLE[square][occupancy & BISHOP_MASKS[square]]
+
+
+def _between_masks(square):
+    # squares strictly between this square and every square sharing a rank, file or diagonal with it
+    masks = [0] * 64
+    for direction in range(0, 8):
+        ray = RAYS[direction][square]
+        for target in iterate_bits(ray):
+            masks[target] = ray & ~RAYS[direction][target] & ~(1 << target)
+    return masks
+
+
+BETWEEN = [_between_masks(square) for square in range(64)]
+
+
+def knight_attacks(square, occupancy):
+    # same signature as the sliding lookups so move generators can treat all pieces alike
+    return KNIGHT_ATTACKS[square]
@@ -0,0 +1,91 @@
+#
+# The Bitboard class
+# Will store one 64-bit integer per piece type and color plus occupancy masks for the chess board.
+#
+# Square indexes follow the board layout in chess_engine: square = row * 8 + col, so bit 0 is (r=0, c=0)
+# and bit 63 is (r=7, c=7).
+#
+from enums import Player
+
+PIECE_NAMES = ('p', 'n', 'b', 'r', 'q', 'k')
+PLAYERS = (Player.PLAYER_1, Player.PLAYER_2)
+FULL_BOARD = (1 << 64) - 1
+
+
+def square_index(row, col):
+    return (row << 3) | col
+
+
+def square_location(square):
+    return square >> 3, square & 7
+
+
+def lsb(bitboard):
+    # index of the lowest set bit
+    return (bitboard & -bitboard).bit_length() - 1
+
+
+def msb(bitboard):
+    # index of the highest set bit
+    return bitboard.bit_length() - 1
+
+
+if hasattr(int, "bit_count"):
+    def popcount(bitboard):
+        return bitboard.bit_count()
+else:
+    def popcount(bitboard):
+        return bin(bitboard).count("1")
+
+
+def iterate_bits(bitboard):
+    while bitboard:
+        low_bit = bitboard & -bitboard
+        yield low_bit.bit_length() - 1
+        bitboard ^= low_bit
+
+
+def bitboard_to_squares(bitboard):
+    # list of (row, col) tuples for every set bit, the form used by the move generators
+    _squares = []
+    while bitboard:
+        low_bit = bitboard & -bitboard
+        square = low_bit.bit_length() - 1
+        _squares.append((square >> 3, square & 7))
+        bitboard ^= low_bit
+    return _squares
+
+
+class bitboard:
+    def __init__(self):
+        self.pieces = {player: dict.fromkeys(PIECE_NAMES, 0) for player in PLAYERS}
+        self.occupancy = dict.fromkeys(PLAYERS, 0)
+        self.all_occupancy = 0
+
+    def add_piece(self, player, name, square):
+        bit = 1 << square
+        self.pieces[player][name] |= bit
+        self.occupancy[player] |= bit
+        self.all_occupancy |= bit
+
+    def remove_piece(self, player, name, square):
+        mask = ~(1 << square)
+        self.pieces[player][name] &= mask
+        self.occupancy[player] &= mask
+        self.all_occupancy &= mask
+
+    def get_pieces(self, player, name):
+        return self.pieces[player][name]
+
+    def get_occupancy(self, player):
+        return self.occupancy[player]
+
+    def get_empty(self):
+        return ~self.all_occupancy & FULL_BOARD
+
+    def piece_count(self, player, name):
+        return popcount(self.pieces[player][name])
+
+    def is_occupied(self, square):
+        return (self.all_occupancy >> square) & 1 == 1
+
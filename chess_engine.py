@@ -4,8 +4,23 @@
 #
 # Note: move log class inspired by Eddie Sharick
 #
-from Piece import Rook, Knight, Bishop, Queen, King, Pawn
+from Piece import get_piece_instance
+from attack_tables import KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, RAYS, ROOK_DIRECTIONS, BETWEEN, first_blocker, \
+    knight_attacks, rook_attacks, bishop_attacks, queen_attacks
+from bitboard import bitboard, square_index, square_location, lsb, iterate_bits, FULL_BOARD, PIECE_NAMES
 from enums import Player
+from move_encoding import QUIET, DOUBLE_PAWN_PUSH, CASTLE_LEFT, CASTLE_RIGHT, CAPTURE, EN_PASSANT, PROMOTION, \
+    PROMOTION_PIECES, PROMOTION_FLAGS, NO_MOVE, encode_move, move_end, move_flags, move_to_squares, squares_to_move, \
+    is_promotion, promotion_piece, move_to_coordinates, square_name, square_from_name, FILES
+from piece_square_tables import PIECE_SQUARE_VALUES
+from zobrist import PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS
+
+STATE_STACK_SIZE = 512
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+# rook starting square -> (castling list, its player, index of that rook's flag)
+_CASTLING_CORNERS = {0: ("white_king_can_castle", Player.PLAYER_1, 1), 7: ("white_king_can_castle", Player.PLAYER_1, 2),
+                     56: ("black_king_can_castle", Player.PLAYER_2, 1),
+                     63: ("black_king_can_castle", Player.PLAYER_2, 2)}
 
 '''
 r \ c     0           1           2           3           4           5           6           7 
@@ -23,92 +38,164 @@ r \ c     0           1           2           3           4           5
 # TODO: Flip the board according to the player
 # TODO: Pawns are usually indicated by no letters
 # TODO: stalemate
-# TODO: move logs - fix king castle boolean update
 # TODO: change move method argument about is_ai into something more elegant
 class game_state:
-    # Initialize 2D array to represent the chess board
-    def __init__(self):
-        # The board is a 2D array
-        # TODO: Change to a numpy format later
+    # Initialize 2D array to represent the chess board, from the starting position unless a FEN is given
+    def __init__(self, fen=START_FEN):
+        # The board is a 2D array; to_array gives the NumPy encoding used for batch evaluation
         self.white_captives = []
         self.black_captives = []
         self.move_log = []
-        self.white_turn = True
-        self.can_en_passant_bool = False
-        self._en_passant_previous = (-1, -1)
         self.checkmate = False
         self.stalemate = False
 
-        self._is_check = False
-        self._white_king_location = [0, 3]
-        self._black_king_location = [7, 3]
-
-        self.white_king_can_castle = [True, True,
-                                      True]  # Has king not moved, has Rook1(col=0) not moved, has Rook2(col=7) not moved
-        self.black_king_can_castle = [True, True, True]
-
-        # Initialize White pieces
-        white_rook_1 = Rook('r', 0, 0, Player.PLAYER_1)
-        white_rook_2 = Rook('r', 0, 7, Player.PLAYER_1)
-        white_knight_1 = Knight('n', 0, 1, Player.PLAYER_1)
-        white_knight_2 = Knight('n', 0, 6, Player.PLAYER_1)
-        white_bishop_1 = Bishop('b', 0, 2, Player.PLAYER_1)
-        white_bishop_2 = Bishop('b', 0, 5, Player.PLAYER_1)
-        white_queen = Queen('q', 0, 4, Player.PLAYER_1)
-        white_king = King('k', 0, 3, Player.PLAYER_1)
-        white_pawn_1 = Pawn('p', 1, 0, Player.PLAYER_1)
-        white_pawn_2 = Pawn('p', 1, 1, Player.PLAYER_1)
-        white_pawn_3 = Pawn('p', 1, 2, Player.PLAYER_1)
-        white_pawn_4 = Pawn('p', 1, 3, Player.PLAYER_1)
-        white_pawn_5 = Pawn('p', 1, 4, Player.PLAYER_1)
-        white_pawn_6 = Pawn('p', 1, 5, Player.PLAYER_1)
-        white_pawn_7 = Pawn('p', 1, 6, Player.PLAYER_1)
-        white_pawn_8 = Pawn('p', 1, 7, Player.PLAYER_1)
-        self.white_pieces = [white_rook_1, white_rook_2, white_knight_1, white_knight_2, white_bishop_1, white_bishop_2,
-                             white_queen, white_king, white_pawn_1, white_pawn_2, white_pawn_3, white_pawn_4,
-                             white_pawn_5,
-                             white_pawn_6, white_pawn_7, white_pawn_8]
-
-        # Initialize Black Pieces
-        black_rook_1 = Rook('r', 7, 0, Player.PLAYER_2)
-        black_rook_2 = Rook('r', 7, 7, Player.PLAYER_2)
-        black_knight_1 = Knight('n', 7, 1, Player.PLAYER_2)
-        black_knight_2 = Knight('n', 7, 6, Player.PLAYER_2)
-        black_bishop_1 = Bishop('b', 7, 2, Player.PLAYER_2)
-        black_bishop_2 = Bishop('b', 7, 5, Player.PLAYER_2)
-        black_queen = Queen('q', 7, 4, Player.PLAYER_2)
-        black_king = King('k', 7, 3, Player.PLAYER_2)
-        black_pawn_1 = Pawn('p', 6, 0, Player.PLAYER_2)
-        black_pawn_2 = Pawn('p', 6, 1, Player.PLAYER_2)
-        black_pawn_3 = Pawn('p', 6, 2, Player.PLAYER_2)
-        black_pawn_4 = Pawn('p', 6, 3, Player.PLAYER_2)
-        black_pawn_5 = Pawn('p', 6, 4, Player.PLAYER_2)
-        black_pawn_6 = Pawn('p', 6, 5, Player.PLAYER_2)
-        black_pawn_7 = Pawn('p', 6, 6, Player.PLAYER_2)
-        black_pawn_8 = Pawn('p', 6, 7, Player.PLAYER_2)
-        self.black_pieces = [black_rook_1, black_rook_2, black_knight_1, black_knight_2, black_bishop_1, black_bishop_2,
-                             black_queen, black_king, black_pawn_1, black_pawn_2, black_pawn_3, black_pawn_4,
-                             black_pawn_5,
-                             black_pawn_6, black_pawn_7, black_pawn_8]
-
-        self.board = [
-            [white_rook_1, white_knight_1, white_bishop_1, white_king, white_queen, white_bishop_2, white_knight_2,
-             white_rook_2],
-            [white_pawn_1, white_pawn_2, white_pawn_3, white_pawn_4, white_pawn_5, white_pawn_6, white_pawn_7,
-             white_pawn_8],
-            [Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY,
-             Player.EMPTY],
-            [Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY,
-             Player.EMPTY],
-            [Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY,
-             Player.EMPTY],
-            [Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY, Player.EMPTY,
-             Player.EMPTY],
-            [black_pawn_1, black_pawn_2, black_pawn_3, black_pawn_4, black_pawn_5, black_pawn_6, black_pawn_7,
-             black_pawn_8],
-            [black_rook_1, black_knight_1, black_bishop_1, black_king, black_queen, black_bishop_2, black_knight_2,
-             black_rook_2]
-        ]
+        # Irreversible state saved by make and restored by unmake, grown only when a game outlasts it
+        self._state_stack = [None] * STATE_STACK_SIZE
+        self._ply = 0
+
+        self._load_fen(fen)
+
+    @classmethod
+    def from_fen(cls, fen):
+        return cls(fen)
+
+    def _load_fen(self, fen):
+        '''
+        build the board, bitboards, piece sets, king locations, flags and Zobrist key in one pass over the FEN
+        the half move clock and move number are not tracked, so they are ignored
+        '''
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError("FEN needs piece placement, side to move, castling and en passant fields: " + fen)
+        placement, side_to_move, castling, en_passant = fields[:4]
+        ranks = placement.split("/")
+        if len(ranks) != 8 or side_to_move not in ("w", "b"):
+            raise ValueError("invalid FEN: " + fen)
+
+        # The pieces are shared flyweights, so the board alone records where each one stands
+        self.board = [[Player.EMPTY] * 8 for _ in range(0, 8)]
+        # One 64-bit mask and one set of square indexes per piece type and color, kept in sync with self.board by
+        # _set_square, so the move generator and the evaluation only visit the pieces still on the board
+        self.bitboards = bitboard()
+        self.white_pieces = {name: set() for name in PIECE_NAMES}
+        self.black_pieces = {name: set() for name in PIECE_NAMES}
+        self.piece_squares = {Player.PLAYER_1: self.white_pieces, Player.PLAYER_2: self.black_pieces}
+        # Zobrist key of the position, XORed by _set_square and make as pieces and flags change
+        self.zobrist_key = 0
+        # Material plus piece-square value of each player's pieces, kept up to date by _set_square
+        self.piece_square_scores = {Player.PLAYER_1: 0, Player.PLAYER_2: 0}
+        self._white_king_location = None
+        self._black_king_location = None
+
+        # FEN lists rank 8 first and each rank from the a-file, which is column 7 of the board
+        for rank_index, rank in enumerate(ranks):
+            row = 7 - rank_index
+            col = 7
+            for character in rank:
+                if character.isdigit():
+                    col -= int(character)
+                    continue
+                name = character.lower()
+                if name not in PIECE_NAMES or col < 0:
+                    raise ValueError("invalid FEN: " + fen)
+                player = Player.PLAYER_1 if character.isupper() else Player.PLAYER_2
+                square = square_index(row, col)
+                self.board[row][col] = get_piece_instance(player, name)
+                self.bitboards.add_piece(player, name, square)
+                self.piece_squares[player][name].add(square)
+                self.zobrist_key ^= PIECE_KEYS[player][name][square]
+                self.piece_square_scores[player] += PIECE_SQUARE_VALUES[player][name][square]
+                if name == "k":
+                    if player is Player.PLAYER_1:
+                        self._white_king_location = (row, col)
+                    else:
+                        self._black_king_location = (row, col)
+                col -= 1
+            if col != -1:
+                raise ValueError("invalid FEN: " + fen)
+        if self._white_king_location is None or self._black_king_location is None:
+            raise ValueError("FEN needs both kings: " + fen)
+
+        self.white_turn = side_to_move == "w"
+        if not self.white_turn:
+            self.zobrist_key ^= SIDE_KEY
+
+        # Has king not moved, has Rook1(col=0, h-file) not moved, has Rook2(col=7, a-file) not moved
+        # The flags are kept canonical, so the key only depends on the rights: the king's flag is set exactly when one
+        # of the rook flags is, and make clears all three when the king moves
+        # A right the FEN claims is dropped unless the king and that rook still stand on their starting squares
+        self.white_king_can_castle = [False,
+                                      "K" in castling and self._can_have_castling_right(Player.PLAYER_1, 0, 0),
+                                      "Q" in castling and self._can_have_castling_right(Player.PLAYER_1, 0, 7)]
+        self.black_king_can_castle = [False,
+                                      "k" in castling and self._can_have_castling_right(Player.PLAYER_2, 7, 0),
+                                      "q" in castling and self._can_have_castling_right(Player.PLAYER_2, 7, 7)]
+        for player, castling_rights in ((Player.PLAYER_1, self.white_king_can_castle),
+                                        (Player.PLAYER_2, self.black_king_can_castle)):
+            castling_rights[0] = castling_rights[1] or castling_rights[2]
+            for index in range(0, 3):
+                if castling_rights[index]:
+                    self.zobrist_key ^= CASTLING_KEYS[player][index]
+
+        # FEN names the square behind the pawn that moved two squares, the game state the pawn itself
+        # The square is dropped unless such a pawn of the side that just moved stands in front of it and both the
+        # square and the one the pawn came from are empty
+        self.can_en_passant_bool = False
+        self._en_passant_previous = (-1, -1)
+        if en_passant != "-":
+            if len(en_passant) != 2 or en_passant[0] not in FILES or en_passant[1] not in "36":
+                raise ValueError("invalid FEN en passant square: " + fen)
+            row, col = square_location(square_from_name(en_passant))
+            pawn_row, from_row, pawn_player = (4, 6, Player.PLAYER_2) if self.white_turn else (3, 1, Player.PLAYER_1)
+            pawn = self.board[pawn_row][col]
+            if row == (5 if self.white_turn else 2) and pawn != Player.EMPTY and pawn.is_player(pawn_player) and \
+                    pawn.get_name() == "p" and self.board[row][col] == Player.EMPTY and \
+                    self.board[from_row][col] == Player.EMPTY:
+                self.can_en_passant_bool = True
+                self._en_passant_previous = (pawn_row, col)
+                self.zobrist_key ^= EN_PASSANT_KEYS[col]
+
+        self._is_check = self.is_in_check(Player.PLAYER_1 if self.white_turn else Player.PLAYER_2)
+
+    # True if the player's king and the rook in the given column are both on their starting squares
+    def _can_have_castling_right(self, player, row, rook_col):
+        king = self.board[row][3]
+        rook = self.board[row][rook_col]
+        return king != Player.EMPTY and king.is_player(player) and king.get_name() == "k" and \
+            rook != Player.EMPTY and rook.is_player(player) and rook.get_name() == "r"
+
+    def to_fen(self):
+        '''
+        the position as FEN, with a half move clock of 0 and move number 1 since neither is tracked
+        '''
+        ranks = []
+        for row in range(7, -1, -1):
+            rank = ""
+            empty_squares = 0
+            for col in range(7, -1, -1):
+                piece = self.board[row][col]
+                if piece == Player.EMPTY:
+                    empty_squares += 1
+                    continue
+                if empty_squares:
+                    rank += str(empty_squares)
+                    empty_squares = 0
+                rank += piece.get_name().upper() if piece.is_player(Player.PLAYER_1) else piece.get_name()
+            if empty_squares:
+                rank += str(empty_squares)
+            ranks.append(rank)
+
+        castling = ""
+        if self.white_king_can_castle[0]:
+            castling += ("K" if self.white_king_can_castle[1] else "") + ("Q" if self.white_king_can_castle[2] else "")
+        if self.black_king_can_castle[0]:
+            castling += ("k" if self.black_king_can_castle[1] else "") + ("q" if self.black_king_can_castle[2] else "")
+
+        en_passant = "-"
+        if self.can_en_passant_bool:
+            row, col = self._en_passant_previous
+            en_passant = square_name(square_index(2 if row == 3 else 5, col))
+        return "{} {} {} {} 0 1".format("/".join(ranks), "w" if self.white_turn else "b", castling or "-", en_passant)
 
     def get_piece(self, row, col):
         if (0 <= row < 8) and (0 <= col < 8):
@@ -118,136 +205,257 @@ class game_state:
         evaluated_piece = self.get_piece(row, col)
         return (evaluated_piece is not None) and (evaluated_piece != Player.EMPTY)
 
-    def get_valid_moves(self, starting_square):
+    # Place a piece (or Player.EMPTY) on a square, updating the bitboards and piece sets along with the 2D board
+    def _set_square(self, row, col, piece):
+        square = square_index(row, col)
+        previous_piece = self.board[row][col]
+        if previous_piece != Player.EMPTY:
+            self.bitboards.remove_piece(previous_piece.get_player(), previous_piece.get_name(), square)
+            self.piece_squares[previous_piece.get_player()][previous_piece.get_name()].discard(square)
+            self.zobrist_key ^= PIECE_KEYS[previous_piece.get_player()][previous_piece.get_name()][square]
+            self.piece_square_scores[previous_piece.get_player()] -= \
+                PIECE_SQUARE_VALUES[previous_piece.get_player()][previous_piece.get_name()][square]
+        if piece != Player.EMPTY:
+            self.bitboards.add_piece(piece.get_player(), piece.get_name(), square)
+            self.piece_squares[piece.get_player()][piece.get_name()].add(square)
+            self.zobrist_key ^= PIECE_KEYS[piece.get_player()][piece.get_name()][square]
+            self.piece_square_scores[piece.get_player()] += \
+                PIECE_SQUARE_VALUES[piece.get_player()][piece.get_name()][square]
+        self.board[row][col] = piece
+
+    # The board as an int8 NumPy vector of 64 piece codes (needs numpy, see numpy_board)
+    def to_array(self):
+        # imported here so the game and the AI never load NumPy
+        from numpy_board import board_to_array
+        return board_to_array(self)
+
+    # The square indexes of the player's pieces of one type
+    def get_piece_squares(self, player, name):
+        return self.piece_squares[player][name]
+
+    # Material and piece-square balance from the player's point of view
+    def get_evaluation(self, player):
+        if player is Player.PLAYER_1:
+            return self.piece_square_scores[Player.PLAYER_1] - self.piece_square_scores[Player.PLAYER_2]
+        return self.piece_square_scores[Player.PLAYER_2] - self.piece_square_scores[Player.PLAYER_1]
+
+    def get_zobrist_key(self):
+        return self.zobrist_key
+
+    def compute_zobrist_key(self):
+        '''
+        build the Zobrist key of the current position from scratch, to check the incremental key against
+        '''
+        key = 0
+        for row in range(0, 8):
+            for col in range(0, 8):
+                if self.is_valid_piece(row, col):
+                    piece = self.board[row][col]
+                    key ^= PIECE_KEYS[piece.get_player()][piece.get_name()][square_index(row, col)]
+        if not self.white_turn:
+            key ^= SIDE_KEY
+        for player, castling_rights in ((Player.PLAYER_1, self.white_king_can_castle),
+                                        (Player.PLAYER_2, self.black_king_can_castle)):
+            for index in range(0, 3):
+                if castling_rights[index]:
+                    key ^= CASTLING_KEYS[player][index]
+        if self.can_en_passant_bool:
+            key ^= EN_PASSANT_KEYS[self._en_passant_previous[1]]
+        return key
+
+    def zobrist_key_is_consistent(self):
+        '''
+        true if the incremental key matches both a key built from scratch and the key of the position read back from
+        its FEN, so positions reached by different move orders share a key
+        '''
+        return self.zobrist_key == self.compute_zobrist_key() == game_state.from_fen(self.to_fen()).zobrist_key
+
+    def perft(self, depth):
+        '''
+        count the leaf positions of the legal move tree, the reference test of the move generator
         '''
-        remove pins from valid moves (unless the pinned piece move can get rid of a check and checks is empty
-        remove move from valid moves if the move falls within a check piece's valid move
-        if the moving piece is a king, the ending square cannot be in a check
+        moves = self.get_legal_moves_encoded(Player.PLAYER_1 if self.white_turn else Player.PLAYER_2)
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        for move in moves:
+            self.make(move)
+            nodes += self.perft(depth - 1)
+            self.unmake()
+        return nodes
+
+    def divide(self, depth):
         '''
+        perft split by root move, as a {coordinate move: leaf count} dictionary, to find where two generators differ
+        '''
+        counts = {}
+        for move in self.get_legal_moves_encoded(Player.PLAYER_1 if self.white_turn else Player.PLAYER_2):
+            self.make(move)
+            counts[move_to_coordinates(move)] = self.perft(depth - 1)
+            self.unmake()
+        return counts
+
+    def get_pieces_bitboard(self, player, name):
+        return self.bitboards.get_pieces(player, name)
 
+    def get_occupancy_bitboard(self, player=None):
+        if player is None:
+            return self.bitboards.all_occupancy
+        return self.bitboards.get_occupancy(player)
+
+    def get_valid_moves(self, starting_square):
+        '''
+        legal moves of the piece on the starting square, as (row, col) ending squares
+        '''
         current_row = starting_square[0]
         current_col = starting_square[1]
 
         if self.is_valid_piece(current_row, current_col):
-            valid_moves = []
-            moving_piece = self.get_piece(current_row, current_col)
-            if self.get_piece(current_row, current_col).is_player(Player.PLAYER_1):
-                king_location = self._white_king_location
-            else:
-                king_location = self._black_king_location
-            group = self.check_for_check(king_location, moving_piece.get_player())
-            checking_pieces = group[0]
-            pinned_pieces = group[1]
-            pinned_checks = group[2]
-            initial_valid_piece_moves = moving_piece.get_valid_piece_moves(self)
-
-            # immediate check
-            if checking_pieces:
-                for move in initial_valid_piece_moves:
-                    can_move = True
-                    for piece in checking_pieces:
-                        if moving_piece.get_name() is "k":
-                            temp = self.board[current_row][current_col]
-                            self.board[current_row][current_col] = Player.EMPTY
-                            temp2 = self.board[move[0]][move[1]]
-                            self.board[move[0]][move[1]] = temp
-                            if not self.check_for_check(move, moving_piece.get_player())[0]:
-                                pass
-                            else:
-                                can_move = False
-                            self.board[current_row][current_col] = temp
-                            self.board[move[0]][move[1]] = temp2
-                        elif move == piece and len(checking_pieces) == 1 and moving_piece.get_name() is not "k" and \
-                                (current_row, current_col) not in pinned_pieces:
-                            pass
-                        elif move != piece and len(checking_pieces) == 1 and moving_piece.get_name() is not "k" and \
-                                (current_row, current_col) not in pinned_pieces:
-                            temp = self.board[move[0]][move[1]]
-                            self.board[move[0]][move[1]] = moving_piece
-                            self.board[current_row][current_col] = Player.EMPTY
-                            if self.check_for_check(king_location, moving_piece.get_player())[0]:
-                                can_move = False
-                            self.board[current_row][current_col] = moving_piece
-                            self.board[move[0]][move[1]] = temp
-                        else:
-                            can_move = False
-                    if can_move:
-                        valid_moves.append(move)
-                self._is_check = True
-            # pinned checks
-            elif pinned_pieces and moving_piece.get_name() is not "k":
-                if starting_square not in pinned_pieces:
-                    for move in initial_valid_piece_moves:
-                        valid_moves.append(move)
-                elif starting_square in pinned_pieces:
-                    for move in initial_valid_piece_moves:
-
-                        temp = self.board[move[0]][move[1]]
-                        self.board[move[0]][move[1]] = moving_piece
-                        self.board[current_row][current_col] = Player.EMPTY
-                        if not self.check_for_check(king_location, moving_piece.get_player())[0]:
-                            valid_moves.append(move)
-                        self.board[current_row][current_col] = moving_piece
-                        self.board[move[0]][move[1]] = temp
-            else:
-                if moving_piece.get_name() is "k":
-                    for move in initial_valid_piece_moves:
-                        temp = self.board[current_row][current_col]
-                        temp2 = self.board[move[0]][move[1]]
-                        self.board[current_row][current_col] = Player.EMPTY
-                        self.board[move[0]][move[1]] = temp
-                        if not self.check_for_check(move, moving_piece.get_player())[0]:
-                            valid_moves.append(move)
-                        self.board[current_row][current_col] = temp
-                        self.board[move[0]][move[1]] = temp2
-                else:
-                    for move in initial_valid_piece_moves:
-                        valid_moves.append(move)
-            # if not valid_moves:
-            #     if self._is_check:
-            #         self.checkmate = True
-            #     else:
-            #         self.stalemate = True
-            # else:
-            #     self.checkmate = False
-            #     self.stalemate = False
-            return valid_moves
+            player = self.get_piece(current_row, current_col).get_player()
+            return [move[1] for move in self.get_all_legal_moves(player, 1 << square_index(current_row, current_col))]
         else:
             return None
 
     # 0 if white lost, 1 if black lost, 2 if stalemate, 3 if not game over
     def checkmate_stalemate_checker(self):
-        all_white_moves = self.get_all_legal_moves(Player.PLAYER_1)
-        all_black_moves = self.get_all_legal_moves(Player.PLAYER_2)
-        if self._is_check and self.whose_turn() and not all_white_moves:
+        if self.whose_turn():
+            all_moves = self.get_all_legal_moves(Player.PLAYER_1)
+        else:
+            all_moves = self.get_all_legal_moves(Player.PLAYER_2)
+        if self._is_check and self.whose_turn() and not all_moves:
             print("white lost")
             return 0
-        elif self._is_check and not self.whose_turn() and not all_black_moves:
+        elif self._is_check and not self.whose_turn() and not all_moves:
             print("black lost")
             return 1
-        elif not all_white_moves and not all_black_moves:
+        elif not all_moves:
             return 2
         else:
             return 3
 
-    def get_all_legal_moves(self, player):
-        # _all_valid_moves = [[], []]
-        # for row in range(0, 8):
-        #     for col in range(0, 8):
-        #         if self.is_valid_piece(row, col) and self.get_piece(row, col).is_player(player):
-        #             valid_moves = self.get_valid_moves((row, col))
-        #             if valid_moves:
-        #                 _all_valid_moves[0].append((row, col))
-        #                 _all_valid_moves[1].append(valid_moves)
+    def get_all_legal_moves(self, player, from_squares=FULL_BOARD):
+        '''
+        every legal move of the player as ((row, col), (row, col)) pairs, optionally only for the pieces on from_squares
+        a promoting pawn move is listed once, the piece is chosen when the move is made
+        '''
+        return [move_to_squares(move) for move in self.get_legal_moves_encoded(player, from_squares)
+                if not is_promotion(move) or promotion_piece(move) == "q"]
+
+    def get_legal_moves_encoded(self, player, from_squares=FULL_BOARD, captures_only=False):
+        '''
+        every legal move of the player as encoded integers (see move_encoding), optionally only for the pieces on
+        from_squares, or only the captures and promotions (for the quiescence search). Checks and pins are found once
+        for the whole side, then each piece's attack table is filtered
+        - if there are two checking pieces, only the king can move
+        - if there is one checking piece, the move has to take it or block its ray
+        - a pinned piece can only move along the ray between the king and the pinning piece
+        - the king cannot move to an attacked square, and cannot castle out of, through or into a check
+        '''
         _all_valid_moves = []
-        for row in range(0, 8):
-            for col in range(0, 8):
-                if self.is_valid_piece(row, col) and self.get_piece(row, col).is_player(player):
-                    valid_moves = self.get_valid_moves((row, col))
-                    for move in valid_moves:
-                        _all_valid_moves.append(((row, col), move))
+        pieces = self.bitboards.pieces[player]
+        piece_squares = self.piece_squares[player]
+        occupancy = self.bitboards.all_occupancy
+        player_occupancy = self.bitboards.occupancy[player]
+        opponent_occupancy = occupancy & ~player_occupancy
+        king_square = lsb(pieces["k"])
+        checking_pieces, pinned_pieces, pin_rays = self.get_checks_and_pins(player)
+
+        if (from_squares >> king_square) & 1:
+            # the king does not block the rays of the pieces attacking the squares behind it
+            occupancy_without_king = occupancy & ~(1 << king_square)
+            king_targets = opponent_occupancy if captures_only else ~player_occupancy
+            for target in iterate_bits(KING_ATTACKS[king_square] & king_targets):
+                if not self.square_is_attacked(target, player, occupancy_without_king):
+                    if (opponent_occupancy >> target) & 1:
+                        _all_valid_moves.append(king_square | (target << 6) | (CAPTURE << 12))
+                    else:
+                        _all_valid_moves.append(king_square | (target << 6))
+            if not checking_pieces and not captures_only:
+                # castling: the square the king passes and the square it lands on cannot be attacked
+                if self.king_can_castle_left(player) and \
+                        not self.square_is_attacked(king_square - 1, player, occupancy) and \
+                        not self.square_is_attacked(king_square - 2, player, occupancy):
+                    _all_valid_moves.append(encode_move(king_square, king_square - 2, CASTLE_LEFT))
+                if self.king_can_castle_right(player) and \
+                        not self.square_is_attacked(king_square + 1, player, occupancy) and \
+                        not self.square_is_attacked(king_square + 2, player, occupancy):
+                    _all_valid_moves.append(encode_move(king_square, king_square + 2, CASTLE_RIGHT))
+
+        # double check
+        if checking_pieces & (checking_pieces - 1):
+            return _all_valid_moves
+        allowed_squares = ~player_occupancy & FULL_BOARD
+        # immediate check
+        if checking_pieces:
+            allowed_squares &= checking_pieces | BETWEEN[king_square][lsb(checking_pieces)]
+
+        for name, get_attacks in (("n", knight_attacks), ("b", bishop_attacks), ("r", rook_attacks),
+                                  ("q", queen_attacks)):
+            for square in piece_squares[name]:
+                if not (from_squares >> square) & 1:
+                    continue
+                targets = get_attacks(square, occupancy) & allowed_squares
+                # pinned piece
+                if (pinned_pieces >> square) & 1:
+                    targets &= pin_rays[square]
+                for target in iterate_bits(targets & opponent_occupancy):
+                    _all_valid_moves.append(square | (target << 6) | (CAPTURE << 12))
+                if not captures_only:
+                    for target in iterate_bits(targets & ~opponent_occupancy):
+                        _all_valid_moves.append(square | (target << 6))
+
+        # white pawns move down the rows and start on row 1, black pawns move up and start on row 6
+        if player is Player.PLAYER_1:
+            step = 8
+            starting_row = 1
+            promotion_row = 7
+        else:
+            step = -8
+            starting_row = 6
+            promotion_row = 0
+        for square in piece_squares["p"]:
+            if not (from_squares >> square) & 1:
+                continue
+            targets = PAWN_ATTACKS[player][square] & opponent_occupancy
+            one_step = square + step
+            # a capture-only generation still pushes pawns onto the promotion row
+            if not (occupancy >> one_step) & 1 and (not captures_only or one_step >> 3 == promotion_row):
+                targets |= 1 << one_step
+                if square >> 3 == starting_row and not (occupancy >> (one_step + step)) & 1:
+                    targets |= 1 << (one_step + step)
+            targets &= allowed_squares
+            if (pinned_pieces >> square) & 1:
+                targets &= pin_rays[square]
+            for target in iterate_bits(targets):
+                flags = CAPTURE if (opponent_occupancy >> target) & 1 else QUIET
+                if target >> 3 == promotion_row:
+                    for promotion_flag in PROMOTION_FLAGS.values():
+                        _all_valid_moves.append(square | (target << 6) | ((flags | promotion_flag) << 12))
+                elif target - square == 2 * step:
+                    _all_valid_moves.append(encode_move(square, target, DOUBLE_PAWN_PUSH))
+                else:
+                    _all_valid_moves.append(square | (target << 6) | (flags << 12))
+            starting_location = square_location(square)
+            if self.can_en_passant(starting_location[0], starting_location[1]):
+                ending_location = (starting_location[0] + step // 8, self.previous_piece_en_passant()[1])
+                if self._en_passant_is_legal(player, starting_location, ending_location):
+                    _all_valid_moves.append(squares_to_move(starting_location, ending_location, EN_PASSANT))
         return _all_valid_moves
 
+    def _en_passant_is_legal(self, player, starting_square, ending_square):
+        # the captured pawn leaves a square that is not on the moving pawn's path, so test the king against the
+        # occupancy after the capture instead of the pin and check masks
+        captured_bit = 1 << square_index(self.previous_piece_en_passant()[0], self.previous_piece_en_passant()[1])
+        occupancy = (self.bitboards.all_occupancy ^ (1 << square_index(starting_square[0], starting_square[1])) ^
+                     captured_bit) | (1 << square_index(ending_square[0], ending_square[1]))
+        opponent = Player.PLAYER_2 if player is Player.PLAYER_1 else Player.PLAYER_1
+        pieces = self.bitboards.pieces[opponent]
+        king_square = lsb(self.bitboards.pieces[player]["k"])
+        return not ((KNIGHT_ATTACKS[king_square] & pieces["n"]) or
+                    (PAWN_ATTACKS[player][king_square] & pieces["p"] & ~captured_bit) or
+                    (rook_attacks(king_square, occupancy) & (pieces["r"] | pieces["q"])) or
+                    (bishop_attacks(king_square, occupancy) & (pieces["b"] | pieces["q"])))
+
     def king_can_castle_left(self, player):
         if player is Player.PLAYER_1:
             return self.white_king_can_castle[0] and self.white_king_can_castle[1] and \
@@ -259,55 +467,49 @@ class game_state:
     def king_can_castle_right(self, player):
         if player is Player.PLAYER_1:
             return self.white_king_can_castle[0] and self.white_king_can_castle[2] and \
-                   self.get_piece(0, 6) is Player.EMPTY and self.get_piece(0, 5) is Player.EMPTY and not self._is_check
+                   self.get_piece(0, 6) is Player.EMPTY and self.get_piece(0, 5) is Player.EMPTY and \
+                   self.get_piece(0, 4) is Player.EMPTY and not self._is_check
         else:
             return self.black_king_can_castle[0] and self.black_king_can_castle[2] and \
-                   self.get_piece(7, 6) is Player.EMPTY and self.get_piece(7, 5) is Player.EMPTY and not self._is_check
+                   self.get_piece(7, 6) is Player.EMPTY and self.get_piece(7, 5) is Player.EMPTY and \
+                   self.get_piece(7, 4) is Player.EMPTY and not self._is_check
 
     def promote_pawn(self, starting_square, moved_piece, ending_square):
         while True:
             new_piece_name = input("Change pawn to (r, n, b, q):\n")
-            piece_classes = {"r": Rook, "n": Knight, "b": Bishop, "q": Queen}
-            if new_piece_name in piece_classes:
-                move = chess_move(starting_square, ending_square, self, self._is_check)
-
-                new_piece = piece_classes[new_piece_name](new_piece_name, ending_square[0],
-                                                          ending_square[1], moved_piece.get_player())
-                self.board[ending_square[0]][ending_square[1]] = new_piece
-                self.board[moved_piece.get_row_number()][moved_piece.get_col_number()] = Player.EMPTY
-                moved_piece.change_row_number(ending_square[0])
-                moved_piece.change_col_number(ending_square[1])
-                move.pawn_promotion_move(new_piece)
-                self.move_log.append(move)
+            if new_piece_name in PROMOTION_FLAGS:
+                self.promote_pawn_ai(starting_square, moved_piece, ending_square, new_piece_name)
                 break
             else:
                 print("Please choose from these four: r, n, b, q.\n")
 
-    def promote_pawn_ai(self, starting_square, moved_piece, ending_square):
+    def promote_pawn_ai(self, starting_square, moved_piece, ending_square, new_piece_name="q"):
         move = chess_move(starting_square, ending_square, self, self._is_check)
-        # The ai can only promote the pawn to queen
-        new_piece = Queen("q", ending_square[0], ending_square[1], moved_piece.get_player())
-        self.board[ending_square[0]][ending_square[1]] = new_piece
-        self.board[moved_piece.get_row_number()][moved_piece.get_col_number()] = Player.EMPTY
-        moved_piece.change_row_number(ending_square[0])
-        moved_piece.change_col_number(ending_square[1])
-        move.pawn_promotion_move(new_piece)
+        # The ai promotes the pawn to queen unless the encoded move names another piece
+        flags = PROMOTION_FLAGS[new_piece_name]
+        if self.is_valid_piece(ending_square[0], ending_square[1]):
+            flags |= CAPTURE
+        self.make(squares_to_move(starting_square, ending_square, flags))
+        move.pawn_promotion_move(self.get_piece(ending_square[0], ending_square[1]))
         self.move_log.append(move)
 
-    # have to fix en passant for ai
     def can_en_passant(self, current_square_row, current_square_col):
-        return False
-        # if is_ai:
-        #     return False
-        # else:
-        #     return self.can_en_passant_bool and current_square_row == self.previous_piece_en_passant()[0] \
-        #            and abs(current_square_col - self.previous_piece_en_passant()[1]) == 1
+        return self.can_en_passant_bool and current_square_row == self.previous_piece_en_passant()[0] \
+            and abs(current_square_col - self.previous_piece_en_passant()[1]) == 1
 
     def previous_piece_en_passant(self):
         return self._en_passant_previous
 
-    # Move a piece
-    def move_piece(self, starting_square, ending_square, is_ai):
+    # Move a piece, given either its starting and ending squares or a single encoded move
+    def move_piece(self, starting_square, ending_square=None, is_ai=False):
+        new_piece_name = "q"
+        if ending_square is None:
+            # an encoded move carries its own promotion piece, so it never asks for input
+            encoded_move = starting_square
+            starting_square, ending_square = move_to_squares(encoded_move)
+            new_piece_name = promotion_piece(encoded_move) or "q"
+            is_ai = True
+
         current_square_row = starting_square[0]  # The integer row value of the starting square
         current_square_col = starting_square[1]  # The integer col value of the starting square
         next_square_row = ending_square[0]  # The integer row value of the ending square
@@ -322,539 +524,246 @@ class game_state:
             # The chess piece at the starting square
             moving_piece = self.get_piece(current_square_row, current_square_col)
 
-            valid_moves = self.get_valid_moves(starting_square)
-
-            temp = True
-
-            if ending_square in valid_moves:
-                moved_to_piece = self.get_piece(next_square_row, next_square_col)
-                if moving_piece.get_name() is "k":
-                    if moving_piece.is_player(Player.PLAYER_1):
-                        if moved_to_piece == Player.EMPTY and next_square_col == 1 and self.king_can_castle_left(
-                                moving_piece.get_player()):
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            move.castling_move((0, 0), (0, 2), self)
-                            self.move_log.append(move)
-
-                            # move rook
-                            self.get_piece(0, 0).change_col_number(2)
-
-                            self.board[0][2] = self.board[0][0]
-                            self.board[0][0] = Player.EMPTY
-
-                            self.white_king_can_castle[0] = False
-                            self.white_king_can_castle[1] = False
-
-                        elif moved_to_piece == Player.EMPTY and next_square_col == 5 and self.king_can_castle_right(
-                                moving_piece.get_player()):
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            move.castling_move((0, 7), (0, 4), self)
-                            self.move_log.append(move)
-                            # move rook
-                            self.get_piece(0, 7).change_col_number(4)
-
-                            self.board[0][4] = self.board[0][7]
-                            self.board[0][7] = Player.EMPTY
-
-                            self.white_king_can_castle[0] = False
-                            self.white_king_can_castle[2] = False
-                        else:
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            self.move_log.append(move)
-                            self.white_king_can_castle[0] = False
-                        self._white_king_location = (next_square_row, next_square_col)
-                    else:
-                        if moved_to_piece == Player.EMPTY and next_square_col == 1 and self.king_can_castle_left(
-                                moving_piece.get_player()):
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            move.castling_move((7, 0), (7, 2), self)
-                            self.move_log.append(move)
-
-                            self.get_piece(7, 0).change_col_number(2)
-                            # move rook
-                            self.board[7][2] = self.board[7][0]
-                            self.board[7][0] = Player.EMPTY
-
-                            self.black_king_can_castle[0] = False
-                            self.black_king_can_castle[1] = False
-                        elif moved_to_piece == Player.EMPTY and next_square_col == 5 and self.king_can_castle_right(
-                                moving_piece.get_player()):
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            move.castling_move((7, 7), (7, 4), self)
-                            self.move_log.append(move)
-
-                            self.get_piece(0, 7).change_col_number(4)
-
-                            # move rook
-                            self.board[7][4] = self.board[7][7]
-                            self.board[7][7] = Player.EMPTY
-
-                            self.black_king_can_castle[0] = False
-                            self.black_king_can_castle[2] = False
-                        else:
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            self.move_log.append(move)
-                            self.black_king_can_castle[0] = False
-                        self._black_king_location = (next_square_row, next_square_col)
-                        # self.can_en_passant_bool = False  WHAT IS THIS
-                elif moving_piece.get_name() is "r":
-                    if moving_piece.is_player(Player.PLAYER_1) and current_square_col == 0:
-                        self.white_king_can_castle[1] = False
-                    elif moving_piece.is_player(Player.PLAYER_1) and current_square_col == 7:
-                        self.white_king_can_castle[2] = False
-                    elif moving_piece.is_player(Player.PLAYER_2) and current_square_col == 0:
-                        self.white_king_can_castle[1] = False
-                    elif moving_piece.is_player(Player.PLAYER_2) and current_square_col == 7:
-                        self.white_king_can_castle[2] = False
-                    self.move_log.append(chess_move(starting_square, ending_square, self, self._is_check))
-                    self.can_en_passant_bool = False
-                # Add move class here
-                elif moving_piece.get_name() is "p":
-                    # Promoting white pawn
-                    if moving_piece.is_player(Player.PLAYER_1) and next_square_row == 7:
-                        # print("promoting white pawn")
-                        if is_ai:
-                            self.promote_pawn_ai(starting_square, moving_piece, ending_square)
-                        else:
-                            self.promote_pawn(starting_square, moving_piece, ending_square)
-                        temp = False
-                    # Promoting black pawn
-                    elif moving_piece.is_player(Player.PLAYER_2) and next_square_row == 0:
-                        # print("promoting black pawn")
-                        if is_ai:
-                            self.promote_pawn_ai(starting_square, moving_piece, ending_square)
-                        else:
-                            self.promote_pawn(starting_square, moving_piece, ending_square)
-                        temp = False
-                    # Moving pawn forward by two
-                    # Problem with Pawn en passant ai
-                    elif abs(next_square_row - current_square_row) == 2 and current_square_col == next_square_col:
-                        # print("move pawn forward")
-                        self.move_log.append(chess_move(starting_square, ending_square, self, self._is_check))
-                        # self.can_en_passant_bool = True
-                        self._en_passant_previous = (next_square_row, next_square_col)
-                    # en passant
-                    elif abs(next_square_row - current_square_row) == 1 and abs(
-                            current_square_col - next_square_col) == 1 and \
-                            self.can_en_passant(current_square_row, current_square_col):
-                        # print("en passant")
-                        if moving_piece.is_player(Player.PLAYER_1):
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            move.en_passant_move(self.board[next_square_row - 1][next_square_col],
-                                                 (next_square_row - 1, next_square_col))
-                            self.move_log.append(move)
-                            self.board[next_square_row - 1][next_square_col] = Player.EMPTY
-                        else:
-                            move = chess_move(starting_square, ending_square, self, self._is_check)
-                            move.en_passant_move(self.board[next_square_row + 1][next_square_col],
-                                                 (next_square_row + 1, next_square_col))
-                            self.move_log.append(move)
-                            self.board[next_square_row + 1][next_square_col] = Player.EMPTY
-                    # moving forward by one or taking a piece
+            valid_moves = self.get_legal_moves_encoded(moving_piece.get_player(),
+                                                       1 << square_index(current_square_row, current_square_col))
+            ending_index = square_index(next_square_row, next_square_col)
+            valid_moves = [valid_move for valid_move in valid_moves if move_end(valid_move) == ending_index]
+
+            if valid_moves:
+                valid_move = valid_moves[0]
+                if is_promotion(valid_move):
+                    if is_ai:
+                        self.promote_pawn_ai(starting_square, moving_piece, ending_square, new_piece_name)
                     else:
-                        self.move_log.append(chess_move(starting_square, ending_square, self, self._is_check))
-                        self.can_en_passant_bool = False
+                        self.promote_pawn(starting_square, moving_piece, ending_square)
                 else:
-                    self.move_log.append(chess_move(starting_square, ending_square, self, self._is_check))
-                    self.can_en_passant_bool = False
-
-                if temp:
-                    moving_piece.change_row_number(next_square_row)
-                    moving_piece.change_col_number(next_square_col)
-                    self.board[next_square_row][next_square_col] = self.board[current_square_row][current_square_col]
-                    self.board[current_square_row][current_square_col] = Player.EMPTY
-
-                self.white_turn = not self.white_turn
-
-            else:
-                pass
+                    move = chess_move(starting_square, ending_square, self, self._is_check)
+                    if move_flags(valid_move) == CASTLE_LEFT:
+                        move.castling_move((current_square_row, 0), (current_square_row, 2), self)
+                    elif move_flags(valid_move) == CASTLE_RIGHT:
+                        move.castling_move((current_square_row, 7), (current_square_row, 4), self)
+                    elif move_flags(valid_move) == EN_PASSANT:
+                        move.en_passant_move(self.get_piece(current_square_row, next_square_col),
+                                             (current_square_row, next_square_col))
+                    self.make(valid_move)
+                    self.move_log.append(move)
 
     def undo_move(self):
         if self.move_log:
             undoing_move = self.move_log.pop()
-            if undoing_move.castled is True:
-                self.board[undoing_move.starting_square_row][
-                    undoing_move.starting_square_col] = undoing_move.moving_piece
-                self.board[undoing_move.ending_square_row][undoing_move.ending_square_col] = undoing_move.removed_piece
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_row_number(
-                    undoing_move.starting_square_row)
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_col_number(
-                    undoing_move.starting_square_col)
-
-                self.board[undoing_move.rook_starting_square[0]][
-                    undoing_move.rook_starting_square[1]] = undoing_move.moving_rook
-                self.board[undoing_move.rook_ending_square[0]][undoing_move.rook_ending_square[1]] = Player.EMPTY
-                undoing_move.moving_rook.change_row_number(undoing_move.rook_starting_square[0])
-                undoing_move.moving_rook.change_col_number(undoing_move.rook_starting_square[1])
-                if undoing_move.moving_piece is Player.PLAYER_1:
-                    if undoing_move.rook_starting_square[1] == 0:
-                        self.white_king_can_castle[0] = True
-                        self.white_king_can_castle[1] = True
-                    elif undoing_move.rook_starting_square[1] == 7:
-                        self.white_king_can_castle[0] = True
-                        self.white_king_can_castle[2] = True
-                else:
-                    if undoing_move.rook_starting_square[1] == 0:
-                        self.black_king_can_castle[0] = True
-                        self.black_king_can_castle[1] = True
-                    elif undoing_move.rook_starting_square[1] == 7:
-                        self.black_king_can_castle[0] = True
-                        self.black_king_can_castle[2] = True
-            elif undoing_move.pawn_promoted is True:
-                self.board[undoing_move.starting_square_row][
-                    undoing_move.starting_square_col] = undoing_move.moving_piece
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_row_number(
-                    undoing_move.starting_square_row)
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_col_number(
-                    undoing_move.starting_square_col)
-
-                self.board[undoing_move.ending_square_row][undoing_move.ending_square_col] = undoing_move.removed_piece
-                if undoing_move.removed_piece != Player.EMPTY:
-                    self.get_piece(undoing_move.ending_square_row, undoing_move.ending_square_col).change_row_number(
-                        undoing_move.ending_square_row)
-                    self.get_piece(undoing_move.ending_square_row, undoing_move.ending_square_col).change_col_number(
-                        undoing_move.ending_square_col)
-            elif undoing_move.en_passaned is True:
-                self.board[undoing_move.starting_square_row][
-                    undoing_move.starting_square_col] = undoing_move.moving_piece
-                self.board[undoing_move.ending_square_row][undoing_move.ending_square_col] = undoing_move.removed_piece
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_row_number(
-                    undoing_move.starting_square_row)
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_col_number(
-                    undoing_move.starting_square_col)
-
-                self.board[undoing_move.en_passant_eaten_square[0]][
-                    undoing_move.en_passant_eaten_square[1]] = undoing_move.en_passant_eaten_piece
-                self.can_en_passant_bool = True
-            else:
-                self.board[undoing_move.starting_square_row][
-                    undoing_move.starting_square_col] = undoing_move.moving_piece
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_row_number(
-                    undoing_move.starting_square_row)
-                self.get_piece(undoing_move.starting_square_row, undoing_move.starting_square_col).change_col_number(
-                    undoing_move.starting_square_col)
-
-                self.board[undoing_move.ending_square_row][undoing_move.ending_square_col] = undoing_move.removed_piece
-                if undoing_move.removed_piece != Player.EMPTY:
-                    self.get_piece(undoing_move.ending_square_row, undoing_move.ending_square_col).change_row_number(
-                        undoing_move.ending_square_row)
-                    self.get_piece(undoing_move.ending_square_row, undoing_move.ending_square_col).change_col_number(
-                        undoing_move.ending_square_col)
-
-            self.white_turn = not self.white_turn
-            # if undoing_move.in_check:
-            #     self._is_check = True
-            if undoing_move.moving_piece.get_name() is 'k' and undoing_move.moving_piece.get_player() is Player.PLAYER_1:
-                self._white_king_location = (undoing_move.starting_square_row, undoing_move.starting_square_col)
-            elif undoing_move.moving_piece.get_name() is 'k' and undoing_move.moving_piece.get_player() is Player.PLAYER_2:
-                self._black_king_location = (undoing_move.starting_square_row, undoing_move.starting_square_col)
-
+            self.unmake()
             return undoing_move
         else:
             print("Back to the beginning!")
 
+    def make(self, move):
+        '''
+        play an encoded move from the move generator without validating it
+        everything the move cannot rebuild by itself is pushed on the state stack first, so unmake restores it exactly
+        '''
+        starting_square = move & 63
+        ending_square = (move >> 6) & 63
+        flags = move >> 12
+        current_square_row = starting_square >> 3
+        current_square_col = starting_square & 7
+        next_square_row = ending_square >> 3
+        next_square_col = ending_square & 7
+
+        moving_piece = self.board[current_square_row][current_square_col]
+        captured_piece = self.board[next_square_row][next_square_col]
+        if flags == EN_PASSANT:
+            captured_piece = self.board[current_square_row][next_square_col]
+
+        if self._ply == len(self._state_stack):
+            self._state_stack.extend([None] * len(self._state_stack))
+        self._state_stack[self._ply] = (move, moving_piece, captured_piece,
+                                        tuple(self.white_king_can_castle), tuple(self.black_king_can_castle),
+                                        self.can_en_passant_bool, self._en_passant_previous,
+                                        self._white_king_location, self._black_king_location, self._is_check,
+                                        self.zobrist_key)
+        self._ply += 1
+
+        if flags == EN_PASSANT:
+            self._set_square(current_square_row, next_square_col, Player.EMPTY)
+        self._set_square(current_square_row, current_square_col, Player.EMPTY)
+        if flags & PROMOTION:
+            self._set_square(next_square_row, next_square_col,
+                             get_piece_instance(moving_piece.get_player(), PROMOTION_PIECES[flags & 3]))
+        else:
+            self._set_square(next_square_row, next_square_col, moving_piece)
+
+        if moving_piece.get_name() == "k":
+            if moving_piece.is_player(Player.PLAYER_1):
+                self._white_king_location = (next_square_row, next_square_col)
+                if self.white_king_can_castle[0]:
+                    self._clear_castling_rights(Player.PLAYER_1, self.white_king_can_castle)
+            else:
+                self._black_king_location = (next_square_row, next_square_col)
+                if self.black_king_can_castle[0]:
+                    self._clear_castling_rights(Player.PLAYER_2, self.black_king_can_castle)
+            # move rook
+            if flags == CASTLE_LEFT:
+                self._move_rook(current_square_row, 0, 2)
+            elif flags == CASTLE_RIGHT:
+                self._move_rook(current_square_row, 7, 4)
+
+        # a rook leaving or captured on its starting corner loses that side's castling
+        for corner in (starting_square, ending_square):
+            if corner in _CASTLING_CORNERS:
+                castling_rights, player, index = _CASTLING_CORNERS[corner]
+                castling_rights = getattr(self, castling_rights)
+                if castling_rights[index]:
+                    castling_rights[index] = False
+                    self.zobrist_key ^= CASTLING_KEYS[player][index]
+                    # with neither rook left to castle with, the king loses its flag as well
+                    if not castling_rights[3 - index]:
+                        castling_rights[0] = False
+                        self.zobrist_key ^= CASTLING_KEYS[player][0]
+
+        if self.can_en_passant_bool:
+            self.zobrist_key ^= EN_PASSANT_KEYS[self._en_passant_previous[1]]
+        if flags == DOUBLE_PAWN_PUSH:
+            self.can_en_passant_bool = True
+            self._en_passant_previous = (next_square_row, next_square_col)
+            self.zobrist_key ^= EN_PASSANT_KEYS[next_square_col]
+        else:
+            self.can_en_passant_bool = False
+            self._en_passant_previous = (-1, -1)
+
+        self.white_turn = not self.white_turn
+        self.zobrist_key ^= SIDE_KEY
+        self._is_check = self.is_in_check(Player.PLAYER_1 if self.white_turn else Player.PLAYER_2)
+
+    # Clear every castling flag of the player that is still set, keeping the Zobrist key in step
+    def _clear_castling_rights(self, player, castling_rights):
+        for index in range(0, 3):
+            if castling_rights[index]:
+                castling_rights[index] = False
+                self.zobrist_key ^= CASTLING_KEYS[player][index]
+
+    def unmake(self):
+        '''
+        take back the last move played with make
+        '''
+        self._ply -= 1
+        (move, moving_piece, captured_piece, white_king_can_castle, black_king_can_castle, self.can_en_passant_bool,
+         self._en_passant_previous, self._white_king_location, self._black_king_location,
+         self._is_check, zobrist_key) = self._state_stack[self._ply]
+        self.white_king_can_castle[:] = white_king_can_castle
+        self.black_king_can_castle[:] = black_king_can_castle
+
+        starting_square = move & 63
+        ending_square = (move >> 6) & 63
+        flags = move >> 12
+        current_square_row = starting_square >> 3
+        current_square_col = starting_square & 7
+        next_square_row = ending_square >> 3
+        next_square_col = ending_square & 7
+
+        if flags == EN_PASSANT:
+            self._set_square(next_square_row, next_square_col, Player.EMPTY)
+            self._set_square(current_square_row, next_square_col, captured_piece)
+        else:
+            self._set_square(next_square_row, next_square_col, captured_piece)
+        self._set_square(current_square_row, current_square_col, moving_piece)
+
+        if flags == CASTLE_LEFT:
+            self._move_rook(current_square_row, 2, 0)
+        elif flags == CASTLE_RIGHT:
+            self._move_rook(current_square_row, 4, 7)
+
+        self.white_turn = not self.white_turn
+        # the pieces put back above XORed the key already, the stored key also restores the flags
+        self.zobrist_key = zobrist_key
+
+    def make_null_move(self):
+        '''
+        pass the turn without moving, for null move pruning; only valid when the side to move is not in check
+        '''
+        if self._ply == len(self._state_stack):
+            self._state_stack.extend([None] * len(self._state_stack))
+        self._state_stack[self._ply] = (NO_MOVE, Player.EMPTY, Player.EMPTY, None, None,
+                                        self.can_en_passant_bool, self._en_passant_previous,
+                                        self._white_king_location, self._black_king_location, self._is_check,
+                                        self.zobrist_key)
+        self._ply += 1
+        if self.can_en_passant_bool:
+            self.zobrist_key ^= EN_PASSANT_KEYS[self._en_passant_previous[1]]
+            self.can_en_passant_bool = False
+            self._en_passant_previous = (-1, -1)
+        self.white_turn = not self.white_turn
+        self.zobrist_key ^= SIDE_KEY
+        self._is_check = False
+
+    def unmake_null_move(self):
+        self._ply -= 1
+        (_, _, _, _, _, self.can_en_passant_bool, self._en_passant_previous, self._white_king_location,
+         self._black_king_location, self._is_check, self.zobrist_key) = self._state_stack[self._ply]
+        self.white_turn = not self.white_turn
+
+    def _move_rook(self, row, starting_col, ending_col):
+        rook = self.board[row][starting_col]
+        self._set_square(row, starting_col, Player.EMPTY)
+        self._set_square(row, ending_col, rook)
+
     # true if white, false if black
     def whose_turn(self):
         return self.white_turn
 
-    '''
-    check for immediate check
-    - check 8 directions and 8 knight squares
-    check for pins
-    - whatever blocked from above is a pin
-    
-     - if immediate check, change check value to true
-     - list valid moves to prevent check but not remove pin
-     - if there are no valid moves to prevent check, checkmate
-    '''
-
-    def check_for_check(self, king_location, player):
-        # self._is_check = False
-        _checks = []
-        _pins = []
-        _pins_check = []
-
-        king_location_row = king_location[0]
-        king_location_col = king_location[1]
-
-        _up = 1
-        _down = 1
-        _left = 1
-        _right = 1
-
-        # Left of the king
-        _possible_pin = ()
-        while king_location_col - _left >= 0 and self.get_piece(king_location_row,
-                                                                king_location_col - _left) is not None:
-            if self.is_valid_piece(king_location_row, king_location_col - _left) and \
-                    self.get_piece(king_location_row, king_location_col - _left).is_player(player) and \
-                    self.get_piece(king_location_row, king_location_col - _left).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row, king_location_col - _left)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row, king_location_col - _left) and \
-                    not self.get_piece(king_location_row, king_location_col - _left).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row,
-                                                                                king_location_col - _left).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row, king_location_col - _left))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row,
-                                                                                king_location_col - _left).get_valid_piece_takes(
-                            self):
-                        # self._is_check = True
-                        _checks.append((king_location_row, king_location_col - _left))
-                break
-            _left += 1
-
-        # right of the king
-        _possible_pin = ()
-        while king_location_col + _right < 8 and self.get_piece(king_location_row,
-                                                                king_location_col + _right) is not None:
-            if self.is_valid_piece(king_location_row, king_location_col + _right) and \
-                    self.get_piece(king_location_row, king_location_col + _right).is_player(player) and \
-                    self.get_piece(king_location_row, king_location_col + _right).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row, king_location_col + _right)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row, king_location_col + _right) and \
-                    not self.get_piece(king_location_row, king_location_col + _right).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row,
-                                                                                king_location_col + _right).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row, king_location_col + _right))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row,
-                                                                                king_location_col + _right).get_valid_piece_takes(
-                            self):
-                        # self._is_check = True
-                        _checks.append((king_location_row, king_location_col + _right))
-                break
-            _right += 1
-
-        # below the king
-        _possible_pin = ()
-        while king_location_row + _down < 8 and self.get_piece(king_location_row + _down,
-                                                               king_location_col) is not None:
-            if self.is_valid_piece(king_location_row + _down, king_location_col) and \
-                    self.get_piece(king_location_row + _down, king_location_col).is_player(player) and \
-                    self.get_piece(king_location_row + _down, king_location_col).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row + _down, king_location_col)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row + _down, king_location_col) and \
-                    not self.get_piece(king_location_row + _down, king_location_col).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row + _down,
-                                                                                king_location_col).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row + _down, king_location_col))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row + _down,
-                                                                                king_location_col).get_valid_piece_takes(
-                        self):
-                        # self._is_check = True
-                        _checks.append((king_location_row + _down, king_location_col))
-                break
-            _down += 1
-
-        # above the king
-        _possible_pin = ()
-        while king_location_row - _up >= 0 and self.get_piece(king_location_row - _up, king_location_col) is not None:
-            if self.is_valid_piece(king_location_row - _up, king_location_col) and \
-                    self.get_piece(king_location_row - _up, king_location_col).is_player(player) and \
-                    self.get_piece(king_location_row - _up, king_location_col).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row - _up, king_location_col)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row - _up, king_location_col) and \
-                    not self.get_piece(king_location_row - _up, king_location_col).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row - _up,
-                                                                                king_location_col).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row - _up, king_location_col))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row - _up,
-                                                                                king_location_col).get_valid_piece_takes(
-                            self):
-                        # self._is_check = True
-                        _checks.append((king_location_row - _up, king_location_col))
-                break
-            _up += 1
-
-        # left up
-        _up = 1
-        _left = 1
-        _possible_pin = ()
-        while king_location_col - _left >= 0 and king_location_row - _up >= 0 and \
-                self.get_piece(king_location_row - _up, king_location_col - _left) is not None:
-            if self.is_valid_piece(king_location_row - _up, king_location_col - _left) and \
-                    self.get_piece(king_location_row - _up, king_location_col - _left).is_player(player) and \
-                    self.get_piece(king_location_row - _up, king_location_col - _left).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row - _up, king_location_col - _left)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row - _up, king_location_col - _left) and \
-                    not self.get_piece(king_location_row - _up, king_location_col - _left).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row - _up,
-                                                                                king_location_col - _left).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row - _up, king_location_col - _left))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row - _up,
-                                                                                king_location_col - _left).get_valid_piece_takes(
-                        self):
-                        # self._is_check = True
-                        _checks.append((king_location_row - _up, king_location_col - _left))
-                break
-            _left += 1
-            _up += 1
-
-        # right up
-        _up = 1
-        _right = 1
-        _possible_pin = ()
-        while king_location_col + _right < 8 and king_location_row - _up >= 0 and \
-                self.get_piece(king_location_row - _up, king_location_col + _right) is not None:
-            if self.is_valid_piece(king_location_row - _up, king_location_col + _right) and \
-                    self.get_piece(king_location_row - _up, king_location_col + _right).is_player(player) and \
-                    self.get_piece(king_location_row - _up, king_location_col + _right).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row - _up, king_location_col + _right)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row - _up, king_location_col + _right) and \
-                    not self.get_piece(king_location_row - _up, king_location_col + _right).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row - _up,
-                                                                                king_location_col + _right).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row - _up, king_location_col + _right))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row - _up,
-                                                                                king_location_col + _right).get_valid_piece_takes(
-                        self):
-                        # self._is_check = True
-                        _checks.append((king_location_row - _up, king_location_col + _right))
-                break
-            _right += 1
-            _up += 1
-
-        # left down
-        _down = 1
-        _left = 1
-        _possible_pin = ()
-        while king_location_col - _left >= 0 and king_location_row + _down < 8 and \
-                self.get_piece(king_location_row + _down, king_location_col - _left) is not None:
-            if self.is_valid_piece(king_location_row + _down, king_location_col - _left) and \
-                    self.get_piece(king_location_row + _down, king_location_col - _left).is_player(player) and \
-                    self.get_piece(king_location_row + _down, king_location_col - _left).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row + _down, king_location_col - _left)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row + _down, king_location_col - _left) and \
-                    not self.get_piece(king_location_row + _down, king_location_col - _left).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row + _down,
-                                                                                king_location_col - _left).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row + _down, king_location_col - _left))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row + _down,
-                                                                                king_location_col - _left).get_valid_piece_takes(
-                        self):
-                        # self._is_check = True
-                        _checks.append((king_location_row + _down, king_location_col - _left))
-                break
-            _left += 1
-            _down += 1
-
-        # right down
-        _down = 1
-        _right = 1
-        _possible_pin = ()
-        while king_location_col + _right < 8 and king_location_row + _down < 8 and \
-                self.get_piece(king_location_row + _down, king_location_col + _right) is not None:
-            if self.is_valid_piece(king_location_row + _down, king_location_col + _right) and \
-                    self.get_piece(king_location_row + _down, king_location_col + _right).is_player(player) and \
-                    self.get_piece(king_location_row + _down, king_location_col + _right).get_name() is not "k":
-                if not _possible_pin:
-                    _possible_pin = (king_location_row + _down, king_location_col + _right)
-                else:
-                    break
-            elif self.is_valid_piece(king_location_row + _down, king_location_col + _right) and \
-                    not self.get_piece(king_location_row + _down, king_location_col + _right).is_player(player):
-                if _possible_pin:
-                    temp = self.board[_possible_pin[0]][_possible_pin[1]]
-                    self.board[_possible_pin[0]][_possible_pin[1]] = Player.EMPTY
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row + _down,
-                                                                                king_location_col + _right).get_valid_piece_takes(
-                            self):
-                        _pins.append(_possible_pin)
-                        _pins_check.append((king_location_row + _down, king_location_col + _right))
-                    self.board[_possible_pin[0]][_possible_pin[1]] = temp
-                else:
-                    if (king_location_row, king_location_col) in self.get_piece(king_location_row + _down,
-                                                                                king_location_col + _right).get_valid_piece_takes(
-                        self):
-                        # self._is_check = True
-                        _checks.append((king_location_row + _down, king_location_col + _right))
-                break
-            _right += 1
-            _down += 1
-
-        # knights
-        row_change = [-2, -2, -1, -1, +1, +1, +2, +2]
-        col_change = [-1, +1, -2, +2, -2, +2, +1, -1]
-        for i in range(0, 8):
-            if self.is_valid_piece(king_location_row + row_change[i], king_location_col + col_change[i]) and \
-                    not self.get_piece(king_location_row + row_change[i], king_location_col + col_change[i]).is_player(
-                        player):
-                if (king_location_row, king_location_col) in self.get_piece(king_location_row + row_change[i],
-                                                                            king_location_col + col_change[
-                                                                                i]).get_valid_piece_takes(self):
-                    # self._is_check = True
-                    _checks.append((king_location_row + row_change[i], king_location_col + col_change[i]))
-        # print([_checks, _pins, _pins_check])
-        return [_pins_check, _pins, _pins_check]
+    def get_checks_and_pins(self, player):
+        '''
+        single pass from the king square of the player, without changing the board
+        - checking_pieces: bitboard of the opponent pieces giving check
+        - pinned_pieces: bitboard of the player's pieces pinned to the king
+        - pin_rays: pinned square -> bitboard of the squares it can still move to (up to and including the pinner)
+        '''
+        opponent = Player.PLAYER_2 if player is Player.PLAYER_1 else Player.PLAYER_1
+        pieces = self.bitboards.pieces[opponent]
+        king_square = lsb(self.bitboards.pieces[player]["k"])
+        occupancy = self.bitboards.all_occupancy
+        player_occupancy = self.bitboards.occupancy[player]
+
+        checking_pieces = (KNIGHT_ATTACKS[king_square] & pieces["n"]) | (PAWN_ATTACKS[player][king_square] & pieces["p"])
+        pinned_pieces = 0
+        pin_rays = {}
+        straight_sliders = pieces["r"] | pieces["q"]
+        diagonal_sliders = pieces["b"] | pieces["q"]
+        for direction in range(0, 8):
+            sliders = straight_sliders if direction in ROOK_DIRECTIONS else diagonal_sliders
+            if not RAYS[direction][king_square] & sliders:
+                continue
+            blocker = first_blocker(direction, king_square, occupancy)
+            if (sliders >> blocker) & 1:
+                checking_pieces |= 1 << blocker
+            elif (player_occupancy >> blocker) & 1:
+                # whatever is blocked from a slider by exactly one of our pieces is a pin
+                attacker = first_blocker(direction, blocker, occupancy)
+                if attacker != -1 and (sliders >> attacker) & 1:
+                    pinned_pieces |= 1 << blocker
+                    pin_rays[blocker] = RAYS[direction][king_square] & ~RAYS[direction][attacker]
+        return checking_pieces, pinned_pieces, pin_rays
+
+    def square_is_attacked(self, square, player, occupancy=None):
+        '''
+        True if any opponent piece of the player attacks the square, looking through the given occupancy
+        '''
+        if occupancy is None:
+            occupancy = self.bitboards.all_occupancy
+        opponent = Player.PLAYER_2 if player is Player.PLAYER_1 else Player.PLAYER_1
+        pieces = self.bitboards.pieces[opponent]
+        return bool((KNIGHT_ATTACKS[square] & pieces["n"]) or
+                    (KING_ATTACKS[square] & pieces["k"]) or
+                    (PAWN_ATTACKS[player][square] & pieces["p"]) or
+                    (rook_attacks(square, occupancy) & (pieces["r"] | pieces["q"])) or
+                    (bishop_attacks(square, occupancy) & (pieces["b"] | pieces["q"])))
+
+    # true if the side to move is in check
+    def in_check(self):
+        return self._is_check
+
+    def is_in_check(self, player):
+        return self.square_is_attacked(lsb(self.bitboards.pieces[player]["k"]), player)
+
 
 
 class chess_move():
@@ -900,3 +809,17 @@ class chess_move():
 
     def get_moving_piece(self):
         return self.moving_piece
+
+    def get_encoded_move(self):
+        if self.castled:
+            flags = CASTLE_LEFT if self.ending_square_col < self.starting_square_col else CASTLE_RIGHT
+        elif self.en_passaned:
+            flags = EN_PASSANT
+        else:
+            flags = QUIET if self.removed_piece == Player.EMPTY else CAPTURE
+            if self.pawn_promoted:
+                flags |= PROMOTION_FLAGS[self.replacement_piece.get_name()]
+            elif self.moving_piece.get_name() == "p" and abs(self.ending_square_row - self.starting_square_row) == 2:
+                flags = DOUBLE_PAWN_PUSH
+        return squares_to_move((self.starting_square_row, self.starting_square_col),
+                               (self.ending_square_row, self.ending_square_col), flags)
@@ -5,18 +5,28 @@
 # Note: The pygame tutorial by Eddie Sharick was used for the GUI engine. The GUI code was altered by Boo Sung Kim to
 # fit in with the rest of the project.
 #
+import os
+
 import chess_engine
 import pygame as py
 
 import ai_engine
+import opening_book
+import tablebase
+from Piece import PIECES
 from enums import Player
+from move_encoding import NO_MOVE
 
 """Variables"""
 WIDTH = HEIGHT = 512  # width and height of the chess board
 DIMENSION = 8  # the dimensions of the chess board
 SQ_SIZE = HEIGHT // DIMENSION  # the size of each of the squares in the board
 MAX_FPS = 15  # FPS for animations
-IMAGES = {}  # images for the chess pieces
+AI_TIME_LIMIT = 2.0  # seconds the AI may think about a move
+BOOK_PATH = "opening_book.bin"  # the AI's opening book, built from BOOK_GAMES_PATH when missing
+BOOK_GAMES_PATH = "book_games.txt"
+TABLEBASE_DIRECTORY = tablebase.DEFAULT_DIRECTORY  # endgame tables written by "python3 tablebase.py generate"
+IMAGES = {}  # images for the chess pieces, keyed by the shared piece instances
 colors = [py.Color("white"), py.Color("gray")]
 
 # TODO: AI black has been worked on. Mirror progress for other two modes
@@ -25,7 +35,28 @@ def load_images():
     Load images for the chess pieces
     '''
     for p in Player.PIECES:
-        IMAGES[p] = py.transform.scale(py.image.load("images/" + p + ".png"), (SQ_SIZE, SQ_SIZE))
+        IMAGES[PIECES[p]] = py.transform.scale(py.image.load("images/" + p + ".png"), (SQ_SIZE, SQ_SIZE))
+
+
+def load_opening_book():
+    '''
+    Open the AI's opening book, building it from the games file first if needed; None when neither file exists
+    '''
+    if not os.path.exists(BOOK_PATH):
+        if not os.path.exists(BOOK_GAMES_PATH):
+            return None
+        opening_book.build_book(opening_book.read_games(BOOK_GAMES_PATH), BOOK_PATH)
+    return opening_book.opening_book(BOOK_PATH)
+
+
+def load_tablebases():
+    '''
+    Open the endgame tables that have been generated; None when there are none
+    '''
+    tables = tablebase.tablebase(TABLEBASE_DIRECTORY)
+    if not len(tables):
+        return None
+    return tables
 
 
 def draw_game_state(screen, game_state, valid_moves, square_selected):
@@ -61,7 +92,7 @@ def draw_pieces(screen, game_state):
         for c in range(DIMENSION):
             piece = game_state.get_piece(r, c)
             if piece is not None and piece != Player.EMPTY:
-                screen.blit(IMAGES[piece.get_player() + "_" + piece.get_name()],
+                screen.blit(IMAGES[piece],
                             py.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
 
 
@@ -119,11 +150,11 @@ def main():
     valid_moves = []
     game_over = False
 
-    ai = ai_engine.chess_ai()
+    ai = ai_engine.chess_ai(opening_book=load_opening_book(), tablebase=load_tablebases())
     game_state = chess_engine.game_state()
     if human_player is 'b':
-        ai_move = ai.minimax_black(game_state, 3, -100000, 100000, True, Player.PLAYER_1)
-        game_state.move_piece(ai_move[0], ai_move[1], True)
+        ai_move = ai.choose_move(game_state, time_limit=AI_TIME_LIMIT).best_move
+        game_state.move_piece(ai_move)
 
     while running:
         for e in py.event.get():
@@ -153,12 +184,10 @@ def main():
                             player_clicks = []
                             valid_moves = []
 
-                            if human_player is 'w':
-                                ai_move = ai.minimax_white(game_state, 3, -100000, 100000, True, Player.PLAYER_2)
-                                game_state.move_piece(ai_move[0], ai_move[1], True)
-                            elif human_player is 'b':
-                                ai_move = ai.minimax_black(game_state, 3, -100000, 100000, True, Player.PLAYER_1)
-                                game_state.move_piece(ai_move[0], ai_move[1], True)
+                            if human_player is 'w' or human_player is 'b':
+                                ai_move = ai.choose_move(game_state, time_limit=AI_TIME_LIMIT).best_move
+                                if ai_move != NO_MOVE:
+                                    game_state.move_piece(ai_move)
                     else:
                         valid_moves = game_state.get_valid_moves((row, col))
                         if valid_moves is None:
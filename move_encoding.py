@@ -0,0 +1,89 @@
+#
+# Compact move encoding
+# A move is a 16-bit integer: bits 0-5 hold the starting square, bits 6-11 the ending square and bits 12-15 the flags.
+# Squares use the bitboard index (row * 8 + col).
+#
+# Flags:
+#   0000 quiet move          0001 pawn moved forward by two
+#   0010 castle left         0011 castle right
+#   0100 capture             0101 en passant capture
+#   1xyy promotion, x set when the promotion also captures, yy the new piece (n, b, r, q)
+#
+QUIET = 0
+DOUBLE_PAWN_PUSH = 1
+CASTLE_LEFT = 2
+CASTLE_RIGHT = 3
+CAPTURE = 4
+EN_PASSANT = 5
+PROMOTION = 8
+
+PROMOTION_PIECES = ('n', 'b', 'r', 'q')
+PROMOTION_FLAGS = {name: PROMOTION | index for index, name in enumerate(PROMOTION_PIECES)}
+
+NO_MOVE = 0
+
+
+def encode_move(starting_square, ending_square, flags=QUIET):
+    return starting_square | (ending_square << 6) | (flags << 12)
+
+
+def move_start(move):
+    return move & 63
+
+
+def move_end(move):
+    return (move >> 6) & 63
+
+
+def move_flags(move):
+    return move >> 12
+
+
+def is_capture(move):
+    return (move >> 12) & CAPTURE != 0
+
+
+def is_promotion(move):
+    return (move >> 12) & PROMOTION != 0
+
+
+def is_castle(move):
+    return (move >> 12) in (CASTLE_LEFT, CASTLE_RIGHT)
+
+
+def promotion_piece(move):
+    # name of the piece the pawn becomes, or None if the move is not a promotion
+    if (move >> 12) & PROMOTION:
+        return PROMOTION_PIECES[(move >> 12) & 3]
+    return None
+
+
+def move_to_squares(move):
+    # the ((row, col), (row, col)) pair used by the GUI and game_state.move_piece
+    starting_square = move & 63
+    ending_square = (move >> 6) & 63
+    return (starting_square >> 3, starting_square & 7), (ending_square >> 3, ending_square & 7)
+
+
+def squares_to_move(starting_square, ending_square, flags=QUIET):
+    return encode_move((starting_square[0] << 3) | starting_square[1], (ending_square[0] << 3) | ending_square[1],
+                       flags)
+
+
+# Coordinate notation ("e2e4", "e7e8q"). The board stores the h-file in column 0, so the file letter is mirrored.
+FILES = "abcdefgh"
+
+
+def square_name(square):
+    return FILES[7 - (square & 7)] + str((square >> 3) + 1)
+
+
+def square_from_name(name):
+    return ((int(name[1]) - 1) << 3) | (7 - FILES.index(name[0]))
+
+
+def move_to_coordinates(move):
+    coordinates = square_name(move & 63) + square_name((move >> 6) & 63)
+    if (move >> 12) & PROMOTION:
+        coordinates += PROMOTION_PIECES[(move >> 12) & 3]
+    return coordinates
@@ -0,0 +1,100 @@
+#
+# NumPy board encoding and batch evaluation
+# Will encode positions as int8 vectors of 64 piece codes (indexed like the bitboards, square = row * 8 + col) and
+# score many of them at once with one lookup into a table of material plus piece-square values.
+#
+# NumPy is optional: the game and the AI never need it, only these batch functions do.
+#
+# Piece codes: 0 empty, 1-6 white pawn, knight, bishop, rook, queen, king, -1 to -6 the black pieces.
+#
+from bitboard import PIECE_NAMES
+from enums import Player
+from piece_square_tables import PIECE_SQUARE_VALUES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+PIECE_CODES = {Player.PLAYER_1: {name: index + 1 for index, name in enumerate(PIECE_NAMES)},
+               Player.PLAYER_2: {name: -(index + 1) for index, name in enumerate(PIECE_NAMES)}}
+# FEN letters: upper case for white, lower case for black
+_FEN_CODES = {name.upper(): code for name, code in PIECE_CODES[Player.PLAYER_1].items()}
+_FEN_CODES.update(PIECE_CODES[Player.PLAYER_2])
+
+_value_table = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is needed for the NumPy board encoding (pip install numpy)")
+
+
+def _get_value_table():
+    # (13, 64) table: row code + 6, column square -> value from white's point of view
+    global _value_table
+    if _value_table is None:
+        _value_table = np.zeros((13, 64), dtype=np.int32)
+        for player, codes in PIECE_CODES.items():
+            sign = 1 if player is Player.PLAYER_1 else -1
+            for name, code in codes.items():
+                _value_table[code + 6] = [sign * value for value in PIECE_SQUARE_VALUES[player][name]]
+    return _value_table
+
+
+def board_to_array(game_state):
+    '''
+    the game state's board as an int8 vector of 64 piece codes
+    '''
+    _require_numpy()
+    codes = np.zeros(64, dtype=np.int8)
+    for player, pieces in game_state.piece_squares.items():
+        for name, squares in pieces.items():
+            code = PIECE_CODES[player][name]
+            for square in squares:
+                codes[square] = code
+    return codes
+
+
+def fen_to_array(fen):
+    '''
+    the piece placement of a FEN as an int8 vector of 64 piece codes, without building a game state
+    '''
+    _require_numpy()
+    codes = np.zeros(64, dtype=np.int8)
+    # FEN lists rank 8 first and each rank from the a-file, which is column 7 of the board
+    for rank_index, rank in enumerate(fen.split()[0].split("/")):
+        square = ((7 - rank_index) << 3) | 7
+        for character in rank:
+            if character.isdigit():
+                square -= int(character)
+            else:
+                codes[square] = _FEN_CODES[character]
+                square -= 1
+    return codes
+
+
+def positions_to_array(positions):
+    '''
+    stack game states and/or FEN strings into an (N, 64) int8 array
+    '''
+    _require_numpy()
+    boards = np.zeros((len(positions), 64), dtype=np.int8)
+    for index, position in enumerate(positions):
+        boards[index] = fen_to_array(position) if isinstance(position, str) else board_to_array(position)
+    return boards
+
+
+def batch_evaluate(boards, white_to_move=None):
+    '''
+    material plus piece-square score of every board in an (N, 64) array, from white's point of view, or from the
+    side to move's when white_to_move (a boolean array of N) is given; equal to game_state.get_evaluation
+    '''
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8).reshape(-1, 64)
+    scores = _get_value_table()[boards.astype(np.intp) + 6, np.arange(64)].sum(axis=1)
+    if white_to_move is not None:
+        scores = np.where(np.asarray(white_to_move, dtype=bool), scores, -scores)
+    return scores
@@ -0,0 +1,151 @@
+#
+# The Opening Book
+# Will store the moves played from known positions in a binary file that is memory-mapped and binary-searched, so
+# the AI can answer opening moves without searching and without parsing the file first.
+#
+# File layout: a sequence of 12-byte entries sorted by key, then move
+#   key     unsigned 64-bit   Zobrist key of the position (see zobrist.py)
+#   move    unsigned 16-bit   encoded move (see move_encoding.py)
+#   weight  unsigned 16-bit   how often the move was played from the position
+# All numbers are little-endian.
+#
+# Usage:
+#   python3 opening_book.py build GAMES_FILE BOOK_FILE [--plies N]
+#   python3 opening_book.py probe BOOK_FILE [FEN]
+# A games file has one game per line in coordinate notation ("e2e4 e7e5 g1f3"); text after '#' is ignored.
+#
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from chess_engine import game_state
+from enums import Player
+from move_encoding import move_to_coordinates
+
+ENTRY_FORMAT = "<QHH"
+ENTRY_SIZE = struct.calcsize(ENTRY_FORMAT)
+MAX_WEIGHT = 0xFFFF
+DEFAULT_BOOK_PLIES = 16
+
+
+def _legal_moves(state):
+    return state.get_legal_moves_encoded(Player.PLAYER_1 if state.whose_turn() else Player.PLAYER_2)
+
+
+def build_book(games, book_path, max_plies=DEFAULT_BOOK_PLIES):
+    '''
+    write the book of the games (iterables of coordinate moves) to book_path, counting every move played in the
+    first max_plies plies; return the number of entries
+    '''
+    weights = {}
+    for game in games:
+        state = game_state()
+        for coordinate_move in game[:max_plies]:
+            for move in _legal_moves(state):
+                if move_to_coordinates(move) == coordinate_move:
+                    break
+            else:
+                raise ValueError("illegal move {} in game {}".format(coordinate_move, " ".join(game)))
+            entry = (state.get_zobrist_key(), move)
+            weights[entry] = weights.get(entry, 0) + 1
+            state.make(move)
+    with open(book_path, "wb") as book_file:
+        for key, move in sorted(weights):
+            book_file.write(struct.pack(ENTRY_FORMAT, key, move, min(weights[(key, move)], MAX_WEIGHT)))
+    return len(weights)
+
+
+def read_games(games_path):
+    with open(games_path) as games_file:
+        for line in games_file:
+            moves = line.split("#")[0].split()
+            if moves:
+                yield moves
+
+
+class opening_book:
+    def __init__(self, book_path):
+        self._file = open(book_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # an empty file cannot be mapped, and has no entries to read anyway
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._entry_count = size // ENTRY_SIZE
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._entry_count
+
+    def _key_at(self, index):
+        return struct.unpack_from("<Q", self._map, index * ENTRY_SIZE)[0]
+
+    def get_moves(self, key):
+        '''
+        the (move, weight) pairs stored for the position key
+        '''
+        # first entry whose key is not below the one searched for
+        low = 0
+        high = self._entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        while low < self._entry_count:
+            entry_key, move, weight = struct.unpack_from(ENTRY_FORMAT, self._map, low * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            moves.append((move, weight))
+            low += 1
+        return moves
+
+    def choose_move(self, state, random_generator=random):
+        '''
+        a book move for the game state picked at random by weight, or None when the position is not in the book
+        moves that are not legal in the position (a key collision) are left out
+        '''
+        legal_moves = set(_legal_moves(state))
+        moves = [(move, weight) for move, weight in self.get_moves(state.get_zobrist_key()) if move in legal_moves]
+        if not moves:
+            return None
+        pick = random_generator.randrange(sum(weight for move, weight in moves))
+        for move, weight in moves:
+            if pick < weight:
+                return move
+            pick -= weight
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a binary opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="compile a games file into a book")
+    build_parser.add_argument("games_file")
+    build_parser.add_argument("book_file")
+    build_parser.add_argument("--plies", type=int, default=DEFAULT_BOOK_PLIES, help="plies of each game to keep")
+    probe_parser = commands.add_parser("probe", help="list the book moves of a position")
+    probe_parser.add_argument("book_file")
+    probe_parser.add_argument("fen", nargs="?", help="the position (default: the starting position)")
+    arguments = parser.parse_args()
+
+    if arguments.command == "build":
+        entries = build_book(read_games(arguments.games_file), arguments.book_file, arguments.plies)
+        print("wrote {} entries to {}".format(entries, arguments.book_file))
+    else:
+        state = game_state.from_fen(arguments.fen) if arguments.fen else game_state()
+        book = opening_book(arguments.book_file)
+        for move, weight in book.get_moves(state.get_zobrist_key()):
+            print("{:<6} {}".format(move_to_coordinates(move), weight))
+        book.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#
+# Perft benchmark
+# Will run game_state.perft over a fixed set of positions, check the node counts and report the move generator's
+# speed. Any change to the move generator must keep every count identical.
+#
+# Usage: python3 perft_benchmark.py [--depth N] [--divide] [--fen FEN] [position name ...]
+#
+import argparse
+import sys
+import time
+
+from chess_engine import game_state, START_FEN
+
+# name -> (FEN, {depth: expected node count}), the standard perft positions
+POSITIONS = {
+    "start": (START_FEN, {1: 20, 2: 400, 3: 8902, 4: 197281}),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    "endgame": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    "promotions": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                   {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    "discovered-check": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                         {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    "middlegame": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                   {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+}
+DEFAULT_DEPTH = 3
+
+
+def run_benchmark(names, depth, divide=False):
+    '''
+    print the nodes, time and nodes per second of each position, return False if any count is wrong
+    '''
+    all_correct = True
+    total_nodes = 0
+    total_time = 0.0
+    for name in names:
+        fen, expected_counts = POSITIONS[name]
+        state = game_state.from_fen(fen)
+        start_time = time.perf_counter()
+        if divide:
+            counts = state.divide(depth)
+            nodes = sum(counts.values())
+        else:
+            nodes = state.perft(depth)
+        elapsed = time.perf_counter() - start_time
+        total_nodes += nodes
+        total_time += elapsed
+
+        expected = expected_counts.get(depth)
+        if expected is None:
+            status = "unchecked"
+        elif nodes == expected:
+            status = "ok"
+        else:
+            status = "WRONG (expected {})".format(expected)
+            all_correct = False
+        print("{:<17} depth {}  nodes {:>10}  time {:8.3f}s  nps {:>10.0f}  {}".format(
+            name, depth, nodes, elapsed, nodes / elapsed if elapsed else 0, status))
+        if divide:
+            for coordinate_move, count in sorted(counts.items()):
+                print("    {:<6} {}".format(coordinate_move, count))
+    print("{:<17} depth {}  nodes {:>10}  time {:8.3f}s  nps {:>10.0f}".format(
+        "total", depth, total_nodes, total_time, total_nodes / total_time if total_time else 0))
+    return all_correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count perft nodes over fixed positions and time the move generator")
+    parser.add_argument("positions", nargs="*", default=list(POSITIONS), help="names of the positions to run")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--divide", action="store_true", help="also print the node count of every root move")
+    parser.add_argument("--fen", help="run this position instead, without an expected count")
+    arguments = parser.parse_args()
+    if arguments.fen:
+        POSITIONS["fen"] = (arguments.fen, {})
+        arguments.positions = ["fen"]
+    for name in arguments.positions:
+        if name not in POSITIONS:
+            parser.error("unknown position {} (choose from {})".format(name, ", ".join(POSITIONS)))
+    return 0 if run_benchmark(arguments.positions, arguments.depth, arguments.divide) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#
+# Piece values and piece-square tables
+# Will store what each piece is worth on each square, for each color, so the evaluation can be kept up to date one
+# piece at a time as the board changes.
+#
+# The tables are written as seen from white's side of a printed board: rank 8 first, each rank from the a-file.
+# Values are in the same units as the piece values (a pawn is 10). They follow the simplified evaluation function
+# by Tomasz Michniewski, scaled down.
+#
+from bitboard import PLAYERS
+from enums import Player
+
+PIECE_VALUES = {"k": 1000, "q": 100, "r": 50, "b": 30, "n": 30, "p": 10}
+
+_PIECE_SQUARE_TABLES = {
+    "p": [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [5, 5, 5, 5, 5, 5, 5, 5],
+        [1, 1, 2, 3, 3, 2, 1, 1],
+        [0, 0, 1, 2, 2, 1, 0, 0],
+        [0, 0, 0, 2, 2, 0, 0, 0],
+        [0, 0, -1, 0, 0, -1, 0, 0],
+        [0, 1, 1, -2, -2, 1, 1, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    "n": [
+        [-5, -4, -3, -3, -3, -3, -4, -5],
+        [-4, -2, 0, 0, 0, 0, -2, -4],
+        [-3, 0, 1, 1, 1, 1, 0, -3],
+        [-3, 0, 1, 2, 2, 1, 0, -3],
+        [-3, 0, 1, 2, 2, 1, 0, -3],
+        [-3, 0, 1, 1, 1, 1, 0, -3],
+        [-4, -2, 0, 0, 0, 0, -2, -4],
+        [-5, -4, -3, -3, -3, -3, -4, -5],
+    ],
+    "b": [
+        [-2, -1, -1, -1, -1, -1, -1, -2],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-1, 0, 0, 1, 1, 0, 0, -1],
+        [-1, 0, 0, 1, 1, 0, 0, -1],
+        [-1, 0, 1, 1, 1, 1, 0, -1],
+        [-1, 1, 1, 1, 1, 1, 1, -1],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-2, -1, -1, -1, -1, -1, -1, -2],
+    ],
+    "r": [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [1, 1, 1, 1, 1, 1, 1, 1],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 1, 1, 0, 0, 0],
+    ],
+    "q": [
+        [-2, -1, -1, 0, 0, -1, -1, -2],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-1, 0, 0, 0, 0, 0, 0, -1],
+        [-2, -1, -1, 0, 0, -1, -1, -2],
+    ],
+    "k": [
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-3, -4, -4, -5, -5, -4, -4, -3],
+        [-2, -3, -3, -4, -4, -3, -3, -2],
+        [-1, -2, -2, -2, -2, -2, -2, -1],
+        [2, 2, 0, 0, 0, 0, 2, 2],
+        [2, 3, 1, 0, 0, 1, 3, 2],
+    ],
+}
+
+
+def _square_values(player, name):
+    # board square index -> piece value plus table value; row 0 is rank 1 and column 0 is the h-file
+    values = []
+    for square in range(0, 64):
+        row, col = square >> 3, square & 7
+        table_row = 7 - row if player is Player.PLAYER_1 else row
+        values.append(PIECE_VALUES[name] + _PIECE_SQUARE_TABLES[name][table_row][7 - col])
+    return values
+
+
+# PIECE_SQUARE_VALUES[player][name][square]: what the player's piece is worth on the square
+PIECE_SQUARE_VALUES = {player: {name: _square_values(player, name) for name in PIECE_VALUES} for player in PLAYERS}
@@ -0,0 +1,324 @@
+#
+# Endgame tablebases
+# Will solve the king and queen, king and rook, and king and pawn against king endgames by retrograde analysis,
+# store the result of every position in a compact file, and look positions up so the AI plays them perfectly without
+# searching them.
+#
+# Each table is solved with the side that has the extra piece as white. Positions with the piece on black's side are
+# looked up upside down (the rows flipped and the colors swapped).
+#
+# File layout: one byte per position, 2 * 64 * 64 * 64 bytes, at index
+#   (black to move) << 18 | white king square << 12 | black king square << 6 | piece square
+# byte bits:  0-1 result for the side to move (DRAW, WIN, LOSS or ILLEGAL)   2-7 moves until mate
+# A win is a mate in that many moves; a loss is a mate after that many moves of the winning side.
+#
+# Usage:
+#   python3 tablebase.py generate [--directory DIRECTORY]
+#   python3 tablebase.py probe [--directory DIRECTORY] FEN
+#
+import argparse
+import mmap
+import os
+import sys
+import time
+
+from attack_tables import KING_ATTACKS, PAWN_ATTACKS, queen_attacks, rook_attacks
+from bitboard import iterate_bits, lsb, popcount
+from chess_engine import game_state
+from enums import Player
+from move_encoding import move_to_coordinates
+
+DRAW = 0
+WIN = 1
+LOSS = 2
+ILLEGAL = 3
+
+TABLE_NAMES = ("kqk", "krk", "kpk")  # kpk after the other two, since its promotions lead into them
+PIECE_TABLE_NAMES = {"q": "kqk", "r": "krk", "p": "kpk"}
+DEFAULT_DIRECTORY = "tablebases"
+TABLE_SIZE = 2 * 64 * 64 * 64
+_BLACK_TO_MOVE = 1 << 18
+_MAX_MOVES = 63
+
+_KING_SQUARES = [list(iterate_bits(KING_ATTACKS[square])) for square in range(0, 64)]
+_WHITE_PAWN_ATTACKS = PAWN_ATTACKS[Player.PLAYER_1]
+
+
+def _table_path(directory, name):
+    return os.path.join(directory, name + ".tb")
+
+
+def _index(white_to_move, white_king, black_king, piece):
+    return (0 if white_to_move else _BLACK_TO_MOVE) | (white_king << 12) | (black_king << 6) | piece
+
+
+def _piece_attacks(piece_name, square, occupancy):
+    if piece_name == "q":
+        return queen_attacks(square, occupancy)
+    if piece_name == "r":
+        return rook_attacks(square, occupancy)
+    return _WHITE_PAWN_ATTACKS[square]
+
+
+def _piece_squares(piece_name):
+    # a pawn is never on the first or last row
+    return range(8, 56) if piece_name == "p" else range(0, 64)
+
+
+def _piece_predecessors(piece_name, white_king, black_king, piece):
+    # squares the white piece can have come from, without capturing or promoting
+    if piece_name == "p":
+        squares = []
+        empty = ~((1 << white_king) | (1 << black_king))
+        if piece >= 16 and empty >> (piece - 8) & 1:
+            squares.append(piece - 8)
+            if piece >> 3 == 3 and empty >> (piece - 16) & 1:
+                squares.append(piece - 16)
+        return squares
+    occupancy = (1 << white_king) | (1 << black_king)
+    return iterate_bits(_piece_attacks(piece_name, piece, occupancy) & ~occupancy)
+
+
+def generate_table(piece_name, solved_tables=None):
+    '''
+    solve king and piece_name ("q", "r" or "p") against king and return the table as a bytearray
+    solved_tables maps table names to the solved queen and rook tables, which pawn promotions lead into
+    '''
+    results = bytearray([ILLEGAL]) * TABLE_SIZE
+    plies = bytearray(TABLE_SIZE)
+    # black moves from each position that have not been shown to lose yet
+    black_moves_left = bytearray(TABLE_SIZE)
+    # buckets[n]: positions won or lost in n plies, worked through in order so every distance is the shortest
+    buckets = [[]]
+
+    # mark the legal positions drawn, count black's moves and find the mates
+    for white_king in range(0, 64):
+        for black_king in range(0, 64):
+            if black_king == white_king or KING_ATTACKS[white_king] >> black_king & 1:
+                continue
+            for piece in _piece_squares(piece_name):
+                if piece == white_king or piece == black_king:
+                    continue
+                # the black king does not block the squares behind it, since it would be moving along the line
+                attacks = _piece_attacks(piece_name, piece, 1 << white_king)
+                in_check = attacks >> black_king & 1
+                if not in_check:
+                    results[_index(True, white_king, black_king, piece)] = DRAW
+                black_index = _index(False, white_king, black_king, piece)
+                results[black_index] = DRAW
+                guarded = attacks | KING_ATTACKS[white_king]
+                move_count = 0
+                for square in _KING_SQUARES[black_king]:
+                    if not guarded >> square & 1:
+                        move_count += 1
+                black_moves_left[black_index] = move_count
+                if move_count == 0 and in_check:
+                    results[black_index] = LOSS
+                    buckets[0].append(black_index)
+
+    # a pawn that promotes into a won queen or rook ending wins one ply later
+    if piece_name == "p":
+        for promotion_name in ("q", "r"):
+            promotion_table = solved_tables[PIECE_TABLE_NAMES[promotion_name]]
+            for white_king in range(0, 64):
+                for black_king in range(0, 64):
+                    for piece in range(48, 56):
+                        index = _index(True, white_king, black_king, piece)
+                        if results[index] != DRAW or piece + 8 in (white_king, black_king):
+                            continue
+                        entry = promotion_table[_index(False, white_king, black_king, piece + 8)]
+                        if entry & 3 == LOSS:
+                            distance = 2 * (entry >> 2) + 1
+                            while len(buckets) <= distance:
+                                buckets.append([])
+                            buckets[distance].append(index)
+
+    distance = 0
+    while distance < len(buckets):
+        next_bucket = []
+        for index in buckets[distance]:
+            white_king = (index >> 12) & 63
+            black_king = (index >> 6) & 63
+            piece = index & 63
+            if index & _BLACK_TO_MOVE:
+                # black is lost: every white move into this position wins
+                for square in _KING_SQUARES[white_king]:
+                    if square != piece:
+                        previous = _index(True, square, black_king, piece)
+                        if results[previous] == DRAW:
+                            next_bucket.append(previous)
+                for square in _piece_predecessors(piece_name, white_king, black_king, piece):
+                    previous = _index(True, white_king, black_king, square)
+                    if results[previous] == DRAW:
+                        next_bucket.append(previous)
+            else:
+                # white wins, unless a shorter win was already found for this position
+                if results[index] != DRAW:
+                    continue
+                results[index] = WIN
+                plies[index] = distance
+                # black positions whose last move not shown to lose led here are now lost
+                for square in _KING_SQUARES[black_king]:
+                    if square == piece:
+                        continue
+                    previous = _index(False, white_king, square, piece)
+                    if results[previous] == DRAW:
+                        black_moves_left[previous] -= 1
+                        if black_moves_left[previous] == 0:
+                            results[previous] = LOSS
+                            plies[previous] = distance + 1
+                            next_bucket.append(previous)
+        if next_bucket:
+            if len(buckets) == distance + 1:
+                buckets.append(next_bucket)
+            else:
+                buckets[distance + 1].extend(next_bucket)
+        buckets[distance] = None
+        distance += 1
+
+    table = bytearray(TABLE_SIZE)
+    for index in range(0, TABLE_SIZE):
+        result = results[index]
+        if result == WIN:
+            table[index] = WIN | (((plies[index] + 1) >> 1) << 2)
+        elif result == LOSS:
+            table[index] = LOSS | ((plies[index] >> 1) << 2)
+        else:
+            table[index] = result
+    return table
+
+
+def generate_tables(directory=DEFAULT_DIRECTORY):
+    '''
+    solve every table and write it to the directory, yield (name, seconds taken) as each one is done
+    '''
+    os.makedirs(directory, exist_ok=True)
+    solved_tables = {}
+    for name in TABLE_NAMES:
+        start_time = time.perf_counter()
+        solved_tables[name] = generate_table(name[1], solved_tables)
+        with open(_table_path(directory, name), "wb") as table_file:
+            table_file.write(solved_tables[name])
+        yield name, time.perf_counter() - start_time
+
+
+class tablebase:
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        '''
+        map every table file found in the directory; the others are simply not probed
+        '''
+        self.directory = directory
+        self._files = []
+        self._tables = {}
+        for name in TABLE_NAMES:
+            path = _table_path(directory, name)
+            if os.path.exists(path):
+                table_file = open(path, "rb")
+                self._files.append(table_file)
+                self._tables[name[1]] = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for table in self._tables.values():
+            table.close()
+        for table_file in self._files:
+            table_file.close()
+        self._tables = {}
+        self._files = []
+
+    def __len__(self):
+        return len(self._tables)
+
+    def probe(self, state):
+        '''
+        return (result, moves) for the side to move: (WIN, n) mates in n moves, (LOSS, n) is mated after n moves and
+        (DRAW, 0) cannot be won by either side; None when the position is not covered by a loaded table or could
+        not arise in a game
+        '''
+        occupancy = state.get_occupancy_bitboard()
+        piece_count = popcount(occupancy)
+        if piece_count > 3:
+            return None
+        if piece_count == 2:
+            return DRAW, 0
+        # the tables know nothing of castling; a castling flag is only ever set while that king and one of its rooks
+        # are on their starting squares, so this only leaves out king and rook positions that can still castle
+        if state.white_king_can_castle[0] or state.black_king_can_castle[0]:
+            return None
+        strong_player, weak_player = Player.PLAYER_1, Player.PLAYER_2
+        if popcount(state.get_occupancy_bitboard(Player.PLAYER_1)) == 1:
+            strong_player, weak_player = weak_player, strong_player
+        for piece_name in ("q", "r", "p", "b", "n"):
+            piece_bitboard = state.get_pieces_bitboard(strong_player, piece_name)
+            if piece_bitboard:
+                break
+        # a lone knight or bishop cannot mate
+        if piece_name in ("b", "n"):
+            return DRAW, 0
+        table = self._tables.get(piece_name)
+        if table is None:
+            return None
+        white_king = lsb(state.get_pieces_bitboard(strong_player, "k"))
+        black_king = lsb(state.get_pieces_bitboard(weak_player, "k"))
+        piece = lsb(piece_bitboard)
+        if strong_player is Player.PLAYER_2:
+            white_king, black_king, piece = white_king ^ 56, black_king ^ 56, piece ^ 56
+        entry = table[_index(state.whose_turn() == (strong_player is Player.PLAYER_1), white_king, black_king, piece)]
+        if entry & 3 == ILLEGAL:
+            return None
+        return entry & 3, entry >> 2
+
+    def choose_move(self, state):
+        '''
+        the legal move that keeps the best result: the quickest win, else a draw, else the longest loss
+        None when the position is not covered or there is no legal move
+        '''
+        if self.probe(state) is None:
+            return None
+        best_move = None
+        best_rank = None
+        for move in state.get_legal_moves_encoded(Player.PLAYER_1 if state.whose_turn() else Player.PLAYER_2):
+            state.make(move)
+            entry = self.probe(state)
+            state.unmake()
+            if entry is None:
+                continue
+            # rank the move from the mover's side: the opponent losing quickly is best, winning quickly worst
+            result, moves = entry
+            rank = _MAX_MOVES + 1 - moves if result == LOSS else moves - _MAX_MOVES - 1 if result == WIN else 0
+            if best_rank is None or rank > best_rank:
+                best_move = move
+                best_rank = rank
+        return best_move
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or probe the endgame tablebases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="solve the tables and write them to the directory")
+    generate_parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    probe_parser = commands.add_parser("probe", help="print the result and best move of a position")
+    probe_parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    probe_parser.add_argument("fen", help="the position")
+    arguments = parser.parse_args()
+
+    if arguments.command == "generate":
+        for name, seconds in generate_tables(arguments.directory):
+            print("{} written to {} in {:.1f}s".format(name, _table_path(arguments.directory, name), seconds))
+        return 0
+    tables = tablebase(arguments.directory)
+    state = game_state.from_fen(arguments.fen)
+    entry = tables.probe(state)
+    if entry is None:
+        print("not in the tablebases")
+    else:
+        result, moves = entry
+        best_move = tables.choose_move(state)
+        print("{}{}  best move {}".format({DRAW: "draw", WIN: "win", LOSS: "loss"}[result],
+                                          " in {} moves".format(moves) if result != DRAW else "",
+                                          move_to_coordinates(best_move) if best_move else "none"))
+    tables.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
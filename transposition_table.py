@@ -0,0 +1,125 @@
+#
+# The Transposition Table class
+# Will store search results by Zobrist key in a fixed amount of memory, so a position reached again through another
+# move order is not searched a second time.
+#
+# The table is one flat array of unsigned 64-bit words. Each bucket holds two entries of two words:
+#   - the first entry is depth-preferred: it keeps the deepest result unless it is from an older search
+#   - the second entry is always replaced
+# An entry is (key ^ data, data). A probe only accepts it when XORing the two words gives back the key, so a torn or
+# colliding entry is rejected instead of being trusted.
+#
+# data bits:  0-15 best move   16-23 depth   24-25 bound   26-31 search generation   32-63 score + 2^31
+#
+# The words can also live in a multiprocessing.shared_memory block (create_shared / attach_shared), so several
+# processes search with one table. Entries are written without locks; the key check above is what keeps that safe.
+#
+from array import array
+from multiprocessing import shared_memory
+
+EXACT = 1
+LOWER_BOUND = 2  # the score is at least this (the search failed high)
+UPPER_BOUND = 3  # the score is at most this (the search failed low)
+
+DEFAULT_SIZE_MB = 16
+_WORDS_PER_BUCKET = 4
+_BYTES_PER_BUCKET = _WORDS_PER_BUCKET * 8
+_SCORE_OFFSET = 1 << 31
+
+
+def _bucket_count(size_bytes):
+    # round the bucket count down to a power of two so the index is a mask of the key
+    bucket_count = 1
+    while bucket_count * 2 * _BYTES_PER_BUCKET <= size_bytes:
+        bucket_count *= 2
+    return bucket_count
+
+
+class transposition_table:
+    def __init__(self, size_mb=DEFAULT_SIZE_MB, buffer=None):
+        '''
+        a table of about size_mb megabytes, or one laid over an existing buffer (its size then decides the buckets)
+        '''
+        if buffer is None:
+            bucket_count = _bucket_count(size_mb * 1024 * 1024)
+            self._table = array('Q', [0]) * (bucket_count * _WORDS_PER_BUCKET)
+        else:
+            bucket_count = _bucket_count(len(buffer))
+            self._table = memoryview(buffer)[:bucket_count * _BYTES_PER_BUCKET].cast('Q')
+        self._mask = bucket_count - 1
+        self._generation = 0
+        self.shared_memory = None
+
+    @classmethod
+    def create_shared(cls, size_mb=DEFAULT_SIZE_MB):
+        '''
+        a table in a new shared memory block; other processes attach to it by shared_memory.name
+        '''
+        block = shared_memory.SharedMemory(create=True, size=_bucket_count(size_mb * 1024 * 1024) * _BYTES_PER_BUCKET)
+        table = cls(buffer=block.buf)
+        table.clear()
+        table.shared_memory = block
+        return table
+
+    @classmethod
+    def attach_shared(cls, name):
+        block = shared_memory.SharedMemory(name=name)
+        table = cls(buffer=block.buf)
+        table.shared_memory = block
+        return table
+
+    def close(self, unlink=False):
+        '''
+        let go of the shared memory block, and free it when unlink is set (by the process that created it)
+        '''
+        if self.shared_memory is not None:
+            self._table.release()
+            self._table = array('Q')
+            self.shared_memory.close()
+            if unlink:
+                self.shared_memory.unlink()
+            self.shared_memory = None
+
+    def get_size_bytes(self):
+        return len(self._table) * 8
+
+    def clear(self):
+        self._table[:] = array('Q', [0]) * len(self._table)
+        self._generation = 0
+
+    # Called once per search so older entries lose their claim on the depth-preferred slots
+    def new_search(self):
+        self._generation = (self._generation + 1) & 63
+
+    # Processes sharing the table must agree on the generation, or each treats the others' entries as stale
+    def get_generation(self):
+        return self._generation
+
+    def set_generation(self, generation):
+        self._generation = generation & 63
+
+    def probe(self, key):
+        '''
+        return (best move, score, depth, bound) stored for the key, or None
+        '''
+        table = self._table
+        index = (key & self._mask) * _WORDS_PER_BUCKET
+        for slot in (index, index + 2):
+            data = table[slot + 1]
+            if data and table[slot] ^ data == key:
+                return (data & 0xFFFF, (data >> 32) - _SCORE_OFFSET, (data >> 16) & 0xFF, (data >> 24) & 3)
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        table = self._table
+        index = (key & self._mask) * _WORDS_PER_BUCKET
+        data = move | (min(depth, 255) << 16) | (bound << 24) | (self._generation << 26) | \
+            ((score + _SCORE_OFFSET) << 32)
+        preferred_data = table[index + 1]
+        if not preferred_data or table[index] ^ preferred_data == key or \
+                depth >= (preferred_data >> 16) & 0xFF or (preferred_data >> 26) & 63 != self._generation:
+            table[index] = key ^ data
+            table[index + 1] = data
+        else:
+            table[index + 2] = key ^ data
+            table[index + 3] = data
@@ -0,0 +1,23 @@
+#
+# Zobrist keys
+# Will store one random 64-bit number per piece type, color and square, plus numbers for the side to move, each
+# castling flag and the file of an en passant pawn. A position's key is the XOR of the numbers of everything in it,
+# so a move only has to XOR out what it removes and XOR in what it adds.
+#
+# The numbers come from a fixed seed so keys are the same in every process and can be stored in files.
+#
+import random
+
+from bitboard import PIECE_NAMES, PLAYERS
+
+ZOBRIST_SEED = 0x5EED2023
+_random = random.Random(ZOBRIST_SEED)
+
+PIECE_KEYS = {player: {name: [_random.getrandbits(64) for _ in range(64)] for name in PIECE_NAMES}
+              for player in PLAYERS}
+# XORed in while black is to move
+SIDE_KEY = _random.getrandbits(64)
+# one number per flag of white_king_can_castle / black_king_can_castle (king not moved, rook col 0, rook col 7)
+CASTLING_KEYS = {player: [_random.getrandbits(64) for _ in range(3)] for player in PLAYERS}
+# indexed by the column of the pawn that can be taken en passant
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]